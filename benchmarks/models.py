@@ -0,0 +1,51 @@
+from django.db import models
+from trackmaven_django.fields import MultipleChoiceField
+from trackmaven_django.models import BaseModel, ChangedModel
+
+FIELD_COUNTS = (5, 50, 200)
+TRACKING_MODES = ('dict', 'snapshot', 'lazy')
+
+CHANNELS = tuple(
+    ('channel{}'.format(i), 'Channel {}'.format(i)) for i in range(40))
+
+
+def make_model(name, bases, field_count, **attrs):
+    """
+    Creates a model with `field_count` fields, the primary key included,
+    alternating between text and integer fields.
+    """
+    attrs.update({
+        '__module__': __name__,
+        'Meta': type('Meta', (), {'app_label': 'benchmarks'}),
+    })
+    for i in range(field_count - 1):
+        if i % 2:
+            attrs['field_{}'.format(i)] = models.IntegerField(default=i)
+        else:
+            attrs['field_{}'.format(i)] = models.CharField(
+                max_length=100, default='value')
+    return type(str(name), bases, attrs)
+
+
+#: Plain models, to compare the others against, by field count.
+PLAIN_MODELS = dict(
+    (count, make_model('Plain{}'.format(count), (models.Model,), count))
+    for count in FIELD_COUNTS)
+
+#: Changed models by tracking mode and field count.
+CHANGED_MODELS = dict(
+    ((mode, count), make_model(
+        'Changed{}{}'.format(mode.capitalize(), count), (ChangedModel,),
+        count, tracking_mode=mode, save_changed_fields_only=True))
+    for mode in TRACKING_MODES for count in FIELD_COUNTS)
+
+
+class Channels(BaseModel):
+    url = models.CharField(max_length=200, unique=True)
+    text_channels = MultipleChoiceField(choices=CHANNELS)
+    mask_channels = MultipleChoiceField(
+        choices=CHANNELS, storage='bitmask', default=0)
+    frozen_channels = MultipleChoiceField(choices=CHANNELS, frozen=True)
+
+    class Meta:
+        app_label = 'benchmarks'
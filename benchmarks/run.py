@@ -0,0 +1,207 @@
+"""
+Benchmarks of the hot paths of trackmaven_django, run against an in-memory
+SQLite database:
+
+- `ChangedModel` construction, loading, `diff`, `save` and `bulk_save` with
+  5, 50 and 200 fields, for each tracking mode, next to a plain model.
+- `MultipleChoiceField` conversions and validation for each storage.
+- Single versus batch `get_object_or_make` lookups.
+
+Timings are the best of `--repeat` runs, in seconds. Results are printed as
+JSON so that releases can be compared. The lazy tracking mode also reports
+its load time relative to the snapshot mode, `load_vs_snapshot`.
+
+    $ python -m benchmarks --rows 1000 --output bench.json
+"""
+import argparse
+import itertools
+import json
+import platform
+import sys
+from timeit import default_timer
+
+import django
+from django.conf import settings
+
+
+def configure():
+    settings.configure(
+        DATABASES={
+            'default': {
+                'ENGINE': 'django.db.backends.sqlite3',
+                'NAME': ':memory:'
+            }
+        },
+        SECRET_KEY='benchmarks',
+        INSTALLED_APPS=(
+            'benchmarks',
+        ),
+    )
+    django.setup()
+
+    from django.apps import apps
+    from django.db import connection
+    with connection.schema_editor() as editor:
+        for model in apps.get_app_config('benchmarks').get_models():
+            editor.create_model(model)
+
+
+def measure(func, repeat):
+    """
+    Returns the best time of `repeat` calls of `func`.
+    """
+    timings = []
+    for _ in range(repeat):
+        start = default_timer()
+        func()
+        timings.append(default_timer() - start)
+    return min(timings)
+
+
+def count_queries(func):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+    with CaptureQueriesContext(connection) as queries:
+        func()
+    return len(queries)
+
+
+def bench_changed_models(rows, repeat):
+    from django.db import transaction
+    from .models import (
+        CHANGED_MODELS, FIELD_COUNTS, PLAIN_MODELS, TRACKING_MODES)
+
+    results = {}
+    for count in FIELD_COUNTS:
+        plain = PLAIN_MODELS[count]
+        plain.objects.bulk_create([plain() for _ in range(rows)])
+        results[str(count)] = by_mode = {
+            'plain': {
+                'construct': measure(
+                    lambda: [plain() for _ in range(rows)], repeat),
+                'load': measure(lambda: list(plain.objects.all()), repeat),
+            },
+        }
+        for mode in TRACKING_MODES:
+            model = CHANGED_MODELS[mode, count]
+            model.objects.bulk_create([model() for _ in range(rows)])
+            instances = list(model.objects.all())
+            values = ('changed{}'.format(i) for i in itertools.count())
+
+            def change(instances=instances):
+                value = next(values)
+                for instance in instances:
+                    instance.field_0 = value
+                return instances
+
+            def save(instances=instances):
+                with transaction.atomic():
+                    for instance in change(instances[:100]):
+                        instance.save()
+
+            def bulk_save(instances=instances, model=model):
+                model.objects.bulk_save(change(instances))
+
+            change()
+            by_mode[mode] = {
+                'construct': measure(
+                    lambda: [model() for _ in range(rows)], repeat),
+                'load': measure(lambda: list(model.objects.all()), repeat),
+                'diff': measure(
+                    lambda: [instance.diff for instance in instances],
+                    repeat),
+                'save_100': measure(save, repeat),
+                'save_100_queries': count_queries(save),
+                'bulk_save': measure(bulk_save, repeat),
+                'bulk_save_queries': count_queries(bulk_save),
+            }
+        # The lazy mode skips the snapshot, and __setattr__ while loading, so
+        # it should load no slower than the snapshot mode, i.e. at most 1.0
+        by_mode['lazy']['load_vs_snapshot'] = (
+            by_mode['lazy']['load'] / by_mode['snapshot']['load'])
+    return results
+
+
+def bench_multiple_choice_field(rows, repeat):
+    from .models import CHANNELS, Channels
+
+    channels = [value for value, label in CHANNELS[::3]]
+    Channels.objects.bulk_create([
+        Channels(url=str(i), text_channels=channels, mask_channels=channels,
+                 frozen_channels=channels)
+        for i in range(rows)])
+
+    results = {}
+    for name in ('text_channels', 'mask_channels', 'frozen_channels'):
+        field = Channels._meta.get_field(name)
+        prepped = field.get_prep_value(channels)
+        results[field.name] = {
+            'to_python': measure(
+                lambda: [field.to_python(prepped) for _ in range(rows)],
+                repeat),
+            'get_prep_value': measure(
+                lambda: [field.get_prep_value(channels) for _ in range(rows)],
+                repeat),
+            'validate': measure(
+                lambda: [field.validate(channels, None) for _ in range(rows)],
+                repeat),
+            'load': measure(
+                lambda: list(Channels.objects.values_list(name, flat=True)),
+                repeat),
+        }
+    return results
+
+
+def bench_lookups(rows, repeat):
+    from trackmaven_django.query import (
+        get_object_or_make, get_object_or_make_many)
+    from .models import Channels
+
+    # Half of the lookups find a row
+    lookups = [{'url': str(i)} for i in range(rows // 2, rows + rows // 2)]
+
+    def single():
+        return [get_object_or_make(Channels, **lookup) for lookup in lookups]
+
+    def batch():
+        return get_object_or_make_many(Channels, lookups)
+
+    return {
+        'single': measure(single, repeat),
+        'single_queries': count_queries(single),
+        'batch': measure(batch, repeat),
+        'batch_queries': count_queries(batch),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Benchmarks the hot paths of trackmaven_django.')
+    parser.add_argument('--rows', type=int, default=1000,
+                        help='Number of rows or calls per benchmark.')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='Number of runs, the best of which is kept.')
+    parser.add_argument('--output', help='File to write the results to.')
+    args = parser.parse_args(argv)
+
+    configure()
+    import trackmaven_django
+    results = {
+        'environment': {
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'trackmaven_django': trackmaven_django.__version__,
+            'rows': args.rows,
+            'repeat': args.repeat,
+        },
+        'changed_model': bench_changed_models(args.rows, args.repeat),
+        'multiple_choice_field': bench_multiple_choice_field(
+            args.rows, args.repeat),
+        'get_object_or_make': bench_lookups(args.rows, args.repeat),
+    }
+    output = json.dumps(results, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, 'w') as fd:
+            fd.write(output + '\n')
+    else:
+        sys.stdout.write(output + '\n')
@@ -1,7 +1,7 @@
 import re
 from setuptools import setup, find_packages
 
-packages = find_packages(exclude=["tests"])
+packages = find_packages(exclude=["tests", "benchmarks"])
 requires = ["django == 1.9"]
 
 __version__ = ""
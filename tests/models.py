@@ -1,8 +1,16 @@
 from __future__ import unicode_literals
 
 from django.db import models
+from trackmaven_django.changelog import AbstractChangeEvent, ModelSink
+from trackmaven_django.fields import MultipleChoiceField
 from trackmaven_django.models import BaseModel, ChangedModel
 
+CHANNELS = (
+    ('facebook', 'Facebook'),
+    ('twitter', 'Twitter'),
+    ('instagram', 'Instagram'),
+)
+
 
 class TestModel(models.Model):
     text = models.CharField(max_length=100)
@@ -18,3 +26,78 @@ class TestBaseModel(BaseModel, TestModel):
 
 class TestChangedModel(ChangedModel, TestModel):
     pass
+
+
+class TestSnapshotChangedModel(ChangedModel, TestModel):
+    tracking_mode = 'snapshot'
+
+
+class TestLazyChangedModel(ChangedModel, TestModel):
+    tracking_mode = 'lazy'
+
+
+class TestPartialSaveModel(ChangedModel, TestModel):
+    tracking_mode = 'snapshot'
+    save_changed_fields_only = True
+    title = models.CharField(max_length=100, blank=True)
+    modified = models.DateTimeField(auto_now=True)
+
+
+class TestUniqueModel(ChangedModel, TestModel):
+    tracking_mode = 'snapshot'
+    validate_written_fields_only = True
+    slug = models.SlugField(unique=True)
+
+
+class TestUniqueTogetherModel(ChangedModel, TestModel):
+    tracking_mode = 'snapshot'
+    validate_written_fields_only = True
+    slug = models.SlugField()
+
+    class Meta(TestModel.Meta):
+        unique_together = ('text', 'slug')
+
+
+class TestTwoUniqueModel(BaseModel, TestModel):
+    url = models.CharField(max_length=100, unique=True)
+    slug = models.SlugField(unique=True)
+
+
+class TestUntrackedFieldsModel(ChangedModel, TestModel):
+    tracking_mode = 'snapshot'
+    save_changed_fields_only = True
+    untrack_fields = ('body',)
+    body = models.TextField(blank=True)
+
+
+class TestChoicesModel(BaseModel):
+    channels = MultipleChoiceField(choices=CHANNELS)
+    channel_mask = MultipleChoiceField(
+        choices=CHANNELS, storage='bitmask', default=0)
+    frozen_channels = MultipleChoiceField(
+        choices=CHANNELS, frozen=True, default='facebook')
+
+    class Meta:
+        app_label = 'tests'
+
+
+class TestCachedModel(BaseModel, TestModel):
+    lookup_cache_timeout = 60
+
+
+class TestCachedChangedModel(ChangedModel, TestModel):
+    tracking_mode = 'snapshot'
+    lookup_cache_timeout = 60
+    title = models.CharField(max_length=100, blank=True)
+
+
+class TestChangeEvent(AbstractChangeEvent):
+
+    class Meta:
+        app_label = 'tests'
+
+
+class TestLoggedModel(ChangedModel, TestModel):
+    tracking_mode = 'snapshot'
+    change_log = ModelSink('tests.TestChangeEvent')
+    title = models.CharField(max_length=100, blank=True)
@@ -0,0 +1,55 @@
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from trackmaven_django.changelog import ChangeEvent, record_changes
+
+from .models import TestChangeEvent, TestLoggedModel
+
+import pytest
+
+
+@pytest.mark.django_db(transaction=True)
+def test_change_log():
+    with CaptureQueriesContext(connection) as queries:
+        with transaction.atomic():
+            # The values an instance is created with aren't changes
+            instance = TestLoggedModel.objects.create(text="Hello")
+            instance.text = "Bye"
+            instance.title = "Title"
+            instance.save()
+            # Nothing changed, nothing is recorded
+            instance.save()
+            assert TestChangeEvent.objects.count() == 0
+    inserts = [
+        query for query in queries
+        if 'testchangeevent' in query['sql'] and
+        query['sql'].startswith('INSERT')]
+    assert len(inserts) == 1
+
+    events = TestChangeEvent.objects.order_by('pk')
+    pk = str(instance.pk)
+    assert [
+        (event.model, event.object_pk, event.field, event.old, event.new)
+        for event in events] == [
+        ('tests.TestLoggedModel', pk, 'text', 'Hello', 'Bye'),
+        ('tests.TestLoggedModel', pk, 'title', '', 'Title'),
+    ]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_change_log_update_fields():
+    instance = TestLoggedModel.objects.create(text="Hello")
+    TestChangeEvent.objects.all().delete()
+    instance.text = "Bye"
+    instance.title = "Title"
+    instance.save(update_fields=['title'])
+    assert list(TestChangeEvent.objects.values_list('field', flat=True)) == [
+        'title']
+    # The unsaved change is recorded once saved
+    instance.save()
+    assert list(TestChangeEvent.objects.values_list(
+        'field', flat=True).order_by('pk')) == ['title', 'text']
+
+
+def test_record_changes_without_changes():
+    record_changes(TestLoggedModel(), {})
+    assert ChangeEvent._fields == ('model', 'pk', 'field', 'old', 'new')
@@ -1,8 +1,10 @@
 import mock
 from django import test
-from django.core.exceptions import ValidationError
+from django.core.exceptions import ImproperlyConfigured, ValidationError
 from trackmaven_django import fields
 
+from .models import TestChoicesModel
+
 VALID_CHANNEL_NAMES = (
     ('input1', 'input1'),
     ('input2', 'input2'),
@@ -54,6 +56,8 @@ class TestMultipleChoiceField(test.TestCase):
         self.assertEqual(f.get_prep_lookup('exact', 'input1'), 'input1')
         self.assertEqual(f.get_prep_lookup('exact', 'input1'), 'input1')
         self.assertEqual(f.get_prep_lookup('in', ['input1']), ['input1'])
+        self.assertEqual(f.get_prep_lookup('contains', 'input1,input2'),
+                         ['input1', 'input2'])
         self.assertEqual(
                 f.get_prep_lookup('exact',
                                   'input1,input2,input4'),
@@ -83,3 +87,115 @@ class TestMultipleChoiceField(test.TestCase):
         self.assertEqual(f.validate(['input1', 'input2'], fake_model), None)
         with self.assertRaises(ValidationError):
             f.validate(['giant', 'safeway'], fake_model)
+
+    def test_validate_reports_all_invalid_choices(self):
+        f = fields.MultipleChoiceField(
+                choices=VALID_CHANNEL_NAMES)
+        with self.assertRaises(ValidationError) as context:
+            f.validate(['giant', 'input1', 'safeway'], mock.Mock())
+        self.assertEqual(context.exception.messages,
+                         ['invalid_choice: giant, safeway'])
+
+    def test_display(self):
+        instance = TestChoicesModel(channels=['facebook', 'twitter'])
+        self.assertEqual(instance.get_channels_display(), 'Facebook,Twitter')
+
+
+class TestMultipleChoiceFieldFrozen(test.TestCase):
+    def test_to_python(self):
+        f = fields.MultipleChoiceField(
+                choices=VALID_CHANNEL_NAMES, frozen=True)
+        value = f.to_python('input1,input2')
+        self.assertIsInstance(value, fields.ChoiceValues)
+        self.assertEqual(value, ['input1', 'input2'])
+        self.assertEqual(['input1', 'input2'], value)
+        self.assertNotEqual(value, ['input2', 'input1'])
+        self.assertIs(f.to_python('input1,input2'), value)
+        self.assertIs(value[0], f.choice_index.values[0])
+        self.assertEqual(f.get_prep_value(value), 'input1,input2')
+
+    def test_round_trip(self):
+        for channels in (['facebook', 'twitter'], ['facebook', 'twitter']):
+            TestChoicesModel.objects.create(
+                    channels=['facebook'], frozen_channels=channels)
+        first, second = TestChoicesModel.objects.all()
+        self.assertEqual(first.frozen_channels, ['facebook', 'twitter'])
+        self.assertIs(first.frozen_channels, second.frozen_channels)
+
+
+class TestMultipleChoiceFieldStorage(test.TestCase):
+    def test_bitmask(self):
+        f = fields.MultipleChoiceField(
+                choices=VALID_CHANNEL_NAMES, storage='bitmask')
+        self.assertEqual(f.get_internal_type(), 'BigIntegerField')
+        self.assertEqual(f.get_prep_value(['input1', 'input3']), 5)
+        self.assertEqual(f.get_prep_value('input1,input3'), 5)
+        self.assertEqual(f.to_python(5), ['input1', 'input3'])
+        with self.assertRaises(ValueError):
+            f.get_prep_value(['giant'])
+
+    def test_array(self):
+        f = fields.MultipleChoiceField(
+                choices=VALID_CHANNEL_NAMES, storage='array')
+        self.assertEqual(f.get_prep_value('input1,input3'),
+                         ['input1', 'input3'])
+        self.assertEqual(f.get_prep_lookup('in', [['input1']]), [['input1']])
+        postgresql = mock.Mock(vendor='postgresql')
+        self.assertEqual(f.db_type(postgresql), 'text[]')
+        with self.assertRaises(ImproperlyConfigured):
+            f.db_type(mock.Mock(vendor='sqlite'))
+
+    def test_unknown_storage(self):
+        with self.assertRaises(ValueError):
+            fields.MultipleChoiceField(
+                    choices=VALID_CHANNEL_NAMES, storage='json')
+
+    def test_too_many_choices_for_bitmask(self):
+        f = fields.MultipleChoiceField(
+                choices=[(str(i), str(i)) for i in range(64)],
+                storage='bitmask')
+        self.assertEqual([error.id for error in f._check_storage()],
+                         ['trackmaven_django.E001'])
+
+    def test_round_trip(self):
+        instance = TestChoicesModel.objects.create(
+                channels=['facebook', 'instagram'],
+                channel_mask=['twitter', 'instagram'])
+        instance = TestChoicesModel.objects.get(
+                channel_mask=['twitter', 'instagram'])
+        self.assertEqual(instance.channels, ['facebook', 'instagram'])
+        self.assertEqual(instance.channel_mask, ['twitter', 'instagram'])
+
+
+class TestMultipleChoiceFieldLookups(test.TestCase):
+    def setUp(self):
+        self.facebook = TestChoicesModel.objects.create(
+                channels=['facebook'], channel_mask=['facebook'])
+        self.both = TestChoicesModel.objects.create(
+                channels=['facebook', 'twitter'],
+                channel_mask=['facebook', 'twitter'])
+        self.instagram = TestChoicesModel.objects.create(
+                channels=['instagram'], channel_mask=['instagram'])
+
+    def assertFound(self, lookup, value, expected):
+        for name in ('channels', 'channel_mask'):
+            found = TestChoicesModel.objects.filter(
+                    **{'{}__{}'.format(name, lookup): value}).order_by('pk')
+            self.assertEqual(list(found), expected)
+
+    def test_contains(self):
+        self.assertFound('contains', ['facebook'],
+                         [self.facebook, self.both])
+        self.assertFound('contains', ['facebook', 'twitter'], [self.both])
+        self.assertFound('contains', [],
+                         [self.facebook, self.both, self.instagram])
+
+    def test_overlap(self):
+        self.assertFound('overlap', ['twitter', 'instagram'],
+                         [self.both, self.instagram])
+        self.assertFound('overlap', [], [])
+
+    def test_contained_by(self):
+        self.assertFound('contained_by', ['facebook', 'twitter'],
+                         [self.facebook, self.both])
+        self.assertFound('contained_by', 'instagram', [self.instagram])
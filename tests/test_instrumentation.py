@@ -0,0 +1,48 @@
+from django.db import connection
+from trackmaven_django import instrumentation
+from trackmaven_django.query import get_object_or_make
+from .models import TestChangedModel
+
+import pytest
+
+
+def test_measure_disabled():
+    assert instrumentation.callbacks == []
+    assert instrumentation.measure(
+        TestChangedModel, 'save') is instrumentation._NO_MEASURE
+
+
+@pytest.mark.django_db
+def test_collector():
+    with instrumentation.Collector() as collector:
+        instance = TestChangedModel(text="Hello")
+        instance.save()
+        instance.text = "Bye"
+        assert instance.has_changed is True
+        get_object_or_make(TestChangedModel, text="Bye")
+    assert instrumentation.callbacks == []
+
+    assert [measurement.operation for measurement in collector.filter(
+        model='tests.TestChangedModel')] == [
+        'snapshot', 'validate', 'snapshot', 'save', 'diff', 'lookup',
+        'snapshot']
+    save, = collector.filter(operation='save')
+    assert save.queries == 1
+    assert save.duration > 0
+    lookup, = collector.filter(operation='lookup')
+    assert lookup.queries == 1
+
+
+@pytest.mark.django_db
+def test_collector_nested():
+    with instrumentation.Collector() as collector:
+        with instrumentation.measure(TestChangedModel, 'lookups'):
+            get_object_or_make(TestChangedModel, text="Hello")
+            get_object_or_make(TestChangedModel, text="Bye")
+            # Queries are counted without the query log
+            assert connection.queries_logged is False
+    assert [measurement.queries for measurement in collector.filter(
+        operation='lookup')] == [1, 1]
+    lookups, = collector.filter(operation='lookups')
+    assert lookups.queries == 2
+    assert 'cursor' not in connection.__dict__
@@ -0,0 +1,76 @@
+from django.db import transaction
+from trackmaven_django import invalidation
+
+from .models import TestPartialSaveModel, TestSnapshotChangedModel
+
+import pytest
+
+
+@pytest.mark.django_db(transaction=True)
+def test_on_change():
+    calls = []
+
+    def callback(instances):
+        calls.append([instance.text for instance in instances])
+    invalidation.register(TestPartialSaveModel, ['text'], callback)
+    try:
+        first = TestPartialSaveModel.objects.create(text="one")
+        second = TestPartialSaveModel.objects.create(text="two")
+        # Created instances have no changes
+        assert calls == []
+
+        first.text = "uno"
+        first.save()
+        assert calls == [["uno"]]
+
+        # Changes to other fields don't call the callback
+        first.title = "title"
+        first.save()
+        assert calls == [["uno"]]
+
+        with transaction.atomic():
+            first.text = "un"
+            first.save()
+            second.text = "dos"
+            second.save()
+            first.text = "one"
+            first.save()
+            assert calls == [["uno"]]
+        assert calls == [["uno"], ["one", "dos"]]
+
+        first.text = "uno"
+        second.text = "deux"
+        TestPartialSaveModel.objects.bulk_save([first, second])
+        assert calls == [["uno"], ["one", "dos"], ["uno", "deux"]]
+
+        with pytest.raises(ValueError):
+            with transaction.atomic():
+                first.text = "one"
+                first.save()
+                raise ValueError
+        assert calls == [["uno"], ["one", "dos"], ["uno", "deux"]]
+    finally:
+        invalidation.unregister(TestPartialSaveModel, callback)
+
+
+@pytest.mark.django_db(transaction=True)
+def test_on_change_models():
+    calls = []
+
+    def callback(instances):
+        calls.append([instance.text for instance in instances])
+    invalidation.register(TestPartialSaveModel, ['text'], callback)
+    invalidation.register(TestSnapshotChangedModel, ['text'], callback)
+    try:
+        first = TestPartialSaveModel.objects.create(pk=1, text="one")
+        second = TestSnapshotChangedModel.objects.create(pk=1, text="two")
+        # Instances of different models with the same pk are all passed
+        with transaction.atomic():
+            first.text = "uno"
+            first.save()
+            second.text = "dos"
+            second.save()
+    finally:
+        invalidation.unregister(TestPartialSaveModel, callback)
+        invalidation.unregister(TestSnapshotChangedModel, callback)
+    assert calls == [["uno", "dos"]]
@@ -1,5 +1,13 @@
 from django.core.exceptions import ValidationError
-from .models import TestBaseModel, TestChangedModel
+from django.db import connection
+from django.db.models.signals import post_init
+from django.forms.models import model_to_dict
+from django.test.utils import CaptureQueriesContext
+from .models import (
+    TestBaseModel, TestChangedModel, TestLazyChangedModel,
+    TestPartialSaveModel, TestSnapshotChangedModel, TestUniqueModel,
+    TestUniqueTogetherModel, TestUntrackedFieldsModel)
+from trackmaven_django.models import DEFERRED, validation_stats
 
 import pytest
 
@@ -18,6 +26,34 @@ def test_changed_fields():
     assert instance.changed_fields == ["text"]
 
 
+@pytest.mark.django_db
+def test_untrack_fields_are_saved():
+    instance = TestUntrackedFieldsModel.objects.create(text="Hello")
+    instance.body = "Saved"
+    instance.save()
+    instance = TestUntrackedFieldsModel.objects.get(pk=instance.pk)
+    assert instance.body == "Saved"
+
+    instance.body = "Bulk saved"
+    assert TestUntrackedFieldsModel.objects.bulk_save([instance]) == 1
+    assert TestUntrackedFieldsModel.objects.get(pk=instance.pk).body == (
+        "Bulk saved")
+
+    def change(instance):
+        instance.body = "Applied"
+    list(TestUntrackedFieldsModel.objects.apply_changes(change))
+    assert TestUntrackedFieldsModel.objects.get(pk=instance.pk).body == (
+        "Applied")
+
+    # Deferred untracked fields aren't written
+    instance = TestUntrackedFieldsModel.objects.defer("body").get(
+        pk=instance.pk)
+    instance.text = "Bye"
+    with CaptureQueriesContext(connection) as queries:
+        instance.save()
+    assert "body" not in queries[-1]["sql"]
+
+
 def test_diff():
     instance = TestChangedModel()
     assert instance.diff == {}
@@ -37,3 +73,276 @@ def test_changed_model_full_clean():
     with pytest.raises(ValidationError):
         instance = TestChangedModel(text="hello" * 1024)
         instance.save()
+
+
+def test_snapshot_diff():
+    instance = TestSnapshotChangedModel()
+    assert instance.has_changed is False
+    instance.text = "Hello"
+    assert instance.changed_fields == ["text"]
+    assert instance.diff == {
+        "text": ("", "Hello")
+    }
+
+
+@pytest.mark.django_db
+def test_snapshot_save():
+    instance = TestSnapshotChangedModel(text="Hello")
+    instance.save()
+    assert instance.diff == {}
+    instance = TestSnapshotChangedModel.objects.get(pk=instance.pk)
+    assert instance.has_changed is False
+    # Values of different types are compared by their text
+    instance.id = str(instance.id)
+    assert instance.has_changed is False
+    instance.text = "Bye"
+    assert instance.diff == {
+        "text": ("Hello", "Bye")
+    }
+
+
+@pytest.mark.django_db
+def test_lazy_diff():
+    instance = TestLazyChangedModel.objects.create(text="Hello")
+    instance = TestLazyChangedModel.objects.get(pk=instance.pk)
+    assert instance._ChangedModelMixin__initial == {}
+    instance.text = "Bye"
+    instance.text = "Hello again"
+    assert instance.diff == {
+        "text": ("Hello", "Hello again")
+    }
+    instance.text = "Hello"
+    assert instance.has_changed is False
+    instance.text = "Bye"
+    instance.save()
+    assert instance.changed_fields == []
+
+
+@pytest.mark.django_db
+def test_lazy_load():
+    pk = TestLazyChangedModel.objects.create(text="Hello").pk
+    loaded = []
+
+    def receiver(sender, instance, **kwargs):
+        loaded.append(instance)
+    post_init.connect(receiver, sender=TestLazyChangedModel)
+    try:
+        instance = TestLazyChangedModel.objects.get(pk=pk)
+    finally:
+        post_init.disconnect(receiver, sender=TestLazyChangedModel)
+    assert loaded == [instance]
+    assert (instance.pk, instance.text) == (pk, "Hello")
+    assert (instance._state.adding, instance._state.db) == (False, "default")
+    instance.text = "Bye"
+    assert instance.diff == {"text": ("Hello", "Bye")}
+
+
+@pytest.mark.django_db
+def test_save_changed_fields_only():
+    instance = TestPartialSaveModel(text="Hello", title="Title")
+    instance.save()
+    instance = TestPartialSaveModel.objects.get(pk=instance.pk)
+    with CaptureQueriesContext(connection) as queries:
+        instance.save()
+    assert len(queries) == 0
+
+    instance.text = "Bye"
+    with CaptureQueriesContext(connection) as queries:
+        instance.save()
+    assert len(queries) == 1
+    assert "title" not in queries[0]["sql"]
+    assert instance.has_changed is False
+    instance = TestPartialSaveModel.objects.get(pk=instance.pk)
+    assert (instance.text, instance.title) == ("Bye", "Title")
+
+
+@pytest.mark.django_db
+def test_save_changed_fields_only_auto_now():
+    instance = TestPartialSaveModel.objects.create(text="Hello")
+    modified = instance.modified
+    instance.text = "Bye"
+    instance.save()
+    assert instance.modified > modified
+    assert instance.has_changed is False
+    saved = TestPartialSaveModel.objects.get(pk=instance.pk)
+    assert saved.modified == instance.modified
+
+
+@pytest.mark.django_db
+def test_bulk_save():
+    first, second, third = [
+        TestPartialSaveModel.objects.create(text=text)
+        for text in ("one", "two", "three")]
+    first.text = "uno"
+    second.text = "dos"
+    third.title = "tres"
+    with CaptureQueriesContext(connection) as queries:
+        saved = TestPartialSaveModel.objects.bulk_save(
+            [first, second, third])
+    assert saved == 3
+    assert len(queries) == 2
+    assert [first.has_changed, second.has_changed, third.has_changed] == [
+        False, False, False]
+    assert list(TestPartialSaveModel.objects.order_by("pk").values_list(
+        "text", "title")) == [("uno", ""), ("dos", ""), ("three", "tres")]
+
+
+@pytest.mark.django_db
+def test_apply_changes():
+    TestPartialSaveModel.objects.bulk_create([
+        TestPartialSaveModel(text=str(i)) for i in range(5)])
+
+    def change(instance):
+        if int(instance.text) % 2:
+            instance.title = "odd"
+
+    with CaptureQueriesContext(connection) as queries:
+        chunks = list(TestPartialSaveModel.objects.filter(
+            text__lt="4").apply_changes(change, chunk_size=2))
+    assert [stats.loaded for stats in chunks] == [2, 2]
+    assert [stats.changed for stats in chunks] == [1, 1]
+    assert [stats.saved for stats in chunks] == [1, 1]
+    # Two chunks of one SELECT and one UPDATE, and an empty chunk
+    assert len(queries) == 5
+    assert list(TestPartialSaveModel.objects.order_by("pk").values_list(
+        "title", flat=True)) == ["", "odd", "", "odd", ""]
+
+
+@pytest.mark.django_db
+def test_bulk_save_validates_before_writing():
+    first, second = [
+        TestPartialSaveModel.objects.create(text=text)
+        for text in ("one", "two")]
+    first.text = "uno"
+    second.text = "dos" * 100
+    with pytest.raises(ValidationError):
+        TestPartialSaveModel.objects.bulk_save([first, second])
+    assert TestPartialSaveModel.objects.get(pk=first.pk).text == "one"
+    with pytest.raises(ValueError):
+        TestPartialSaveModel.objects.bulk_save([TestPartialSaveModel()])
+
+
+@pytest.mark.django_db
+def test_bulk_save_validates_unique():
+    TestUniqueModel.objects.create(text="Taken", slug="taken")
+    instances = [
+        TestUniqueModel.objects.create(text=text, slug=text)
+        for text in ("one", "two", "three")]
+    for instance in instances:
+        instance.slug = "taken"
+    # One query for the unique checks of all the instances
+    with CaptureQueriesContext(connection) as queries:
+        with pytest.raises(ValidationError) as excinfo:
+            TestUniqueModel.objects.bulk_save(instances)
+    assert len(queries) == 1
+    assert len(excinfo.value.message_dict["slug"]) == 3
+    assert TestUniqueModel.objects.filter(slug="taken").count() == 1
+
+
+@pytest.mark.django_db
+def test_bulk_save_validates_unique_together():
+    TestUniqueTogetherModel.objects.create(text="Hello", slug="hello")
+    instance = TestUniqueTogetherModel.objects.create(text="Hello", slug="bye")
+    instance.slug = "hello"
+    with pytest.raises(ValidationError) as excinfo:
+        TestUniqueTogetherModel.objects.bulk_save([instance])
+    assert list(excinfo.value.message_dict) == ["__all__"]
+
+
+@pytest.mark.django_db
+def test_validate_written_fields_only():
+    TestUniqueModel.objects.create(text="Hello", slug="hello")
+    instance = TestUniqueModel.objects.create(text="Bye", slug="bye")
+    validation_stats.reset()
+
+    instance.text = "Goodbye"
+    with CaptureQueriesContext(connection) as queries:
+        instance.save()
+    assert len(queries) == 1
+    assert validation_stats.saved_queries == 1
+
+    instance.slug = "hello"
+    with pytest.raises(ValidationError):
+        instance.save()
+    # Only the fields written are cleaned
+    instance = TestUniqueModel.objects.get(pk=instance.pk)
+    instance.text = "Hello" * 100
+    instance.save(update_fields=["slug"])
+    with pytest.raises(ValidationError):
+        instance.save()
+
+
+
+@pytest.mark.django_db
+def test_validate_written_fields_only_unique_together():
+    TestUniqueTogetherModel.objects.create(text="Hello", slug="hello")
+    instance = TestUniqueTogetherModel.objects.create(text="Hello", slug="bye")
+    validation_stats.reset()
+
+    # The constraint is checked when any of its fields is written
+    instance.slug = "hello"
+    with pytest.raises(ValidationError) as excinfo:
+        instance.save()
+    assert list(excinfo.value.message_dict) == ["__all__"]
+    assert validation_stats.saved_queries == 0
+
+    instance = TestUniqueTogetherModel.objects.get(pk=instance.pk)
+    instance.text = "Bye"
+    with CaptureQueriesContext(connection) as queries:
+        instance.save()
+    assert len(queries) == 2
+    assert validation_stats.saved_queries == 0
+
+@pytest.mark.django_db
+def test_model_fields():
+    model_fields = TestChangedModel.__dict__['_model_fields']
+    assert model_fields.names == ('id', 'text')
+    assert model_fields.attnames == {'id': 'id', 'text': 'text'}
+
+    instance = TestChangedModel.objects.create(text="Hello")
+    assert instance.to_dict == model_to_dict(instance)
+    # Deferred classes are prepared too
+    deferred = TestChangedModel.objects.defer('text').get(pk=instance.pk)
+    assert '_model_fields' in type(deferred).__dict__
+
+
+def test_untrack_fields():
+    instance = TestUntrackedFieldsModel()
+    instance.body = "Hello"
+    assert instance.has_changed is False
+    instance.text = "Hello"
+    assert instance.changed_fields == ["text"]
+
+
+@pytest.mark.django_db
+def test_deferred_fields_are_not_loaded():
+    for model in (TestChangedModel, TestSnapshotChangedModel,
+                  TestLazyChangedModel):
+        model.objects.create(text="Hello")
+        model.objects.create(text="Bye")
+        with CaptureQueriesContext(connection) as queries:
+            instances = list(model.objects.defer('text'))
+            assert [instance.diff for instance in instances] == [{}, {}]
+        assert len(queries) == 1
+
+
+@pytest.mark.django_db
+def test_deferred_fields_are_tracked_once_loaded():
+    for model in (TestChangedModel, TestSnapshotChangedModel,
+                  TestLazyChangedModel, TestPartialSaveModel):
+        pk = model.objects.create(text="Hello").pk
+
+        instance = model.objects.only('id').get(pk=pk)
+        assert instance.text == "Hello"
+        assert instance.has_changed is False
+        instance.text = "Bye"
+        assert instance.diff == {"text": ("Hello", "Bye")}
+        instance.save()
+        assert instance.has_changed is False
+        assert model.objects.get(pk=pk).text == "Bye"
+
+        instance = model.objects.only('id').get(pk=pk)
+        instance.text = "Hello"
+        assert instance.diff == {"text": (DEFERRED, "Hello")}
+        instance.refresh_from_db(fields=['text'])
+        assert instance.has_changed is False
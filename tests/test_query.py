@@ -1,5 +1,15 @@
-from .models import TestBaseModel
-from trackmaven_django.query import get_object_or_make
+from django.core.cache import cache
+from django.db import IntegrityError, connection, transaction
+from trackmaven_django.models import get_lookup_cache_version
+from django.test.utils import CaptureQueriesContext
+import mock
+from .models import (
+    TestBaseModel, TestCachedChangedModel, TestCachedModel, TestChangeEvent,
+    TestChangedModel, TestTwoUniqueModel, TestUniqueModel)
+from trackmaven_django.query import (
+    aget_object_or_make, aget_object_or_make_many, get_object_or_make,
+    get_object_or_make_many, get_object_or_make_or_create,
+    get_object_or_make_or_create_many, identity_map)
 import pytest
 
 
@@ -16,3 +26,249 @@ def test_get_object_or_make_not_existing():
     instance, existing = get_object_or_make(TestBaseModel, text="test")
     assert instance.text == "test"
     assert existing is False
+
+
+@pytest.mark.django_db
+def test_get_object_or_make_many():
+    instance = TestBaseModel.objects.create(text="test")
+    with CaptureQueriesContext(connection) as queries:
+        results = get_object_or_make_many(TestBaseModel, [
+            {"text": "missing"},
+            {"text": "test"},
+            {"text": "missing"},
+        ])
+    assert len(queries) == 1
+    (missing, missing_exists), (found, found_exists), (again, _) = results
+    assert found == instance
+    assert found_exists is True
+    assert missing.pk is None
+    assert missing.text == "missing"
+    assert missing_exists is False
+    assert again is missing
+
+
+@pytest.mark.django_db
+def test_get_object_or_make_many_multiple_keys():
+    instance = TestBaseModel.objects.create(text="test")
+    results = get_object_or_make_many(TestBaseModel, [
+        {"pk": instance.pk, "text": "test"},
+        {"pk": instance.pk, "text": "other"},
+    ], batch_size=1)
+    assert results[0] == (instance, True)
+    assert results[1][1] is False
+
+
+@pytest.mark.django_db
+def test_get_object_or_make_many_none():
+    instance = TestChangeEvent.objects.create(
+        model="tests.Post", object_pk="1", field="title", new="Hello")
+    with CaptureQueriesContext(connection) as queries:
+        results = get_object_or_make_many(TestChangeEvent, [
+            {"old": None},
+            {"old": "Hello"},
+        ])
+    assert len(queries) == 1
+    assert results[0] == (instance, True)
+    assert results[1][1] is False
+    assert get_object_or_make_many(TestChangeEvent, [
+        {"old": None, "new": "Hello"},
+    ]) == [(instance, True)]
+
+
+def test_get_object_or_make_many_rejects_lookups():
+    with pytest.raises(ValueError):
+        get_object_or_make_many(TestBaseModel, [{"text__iexact": "test"}])
+
+
+@pytest.mark.django_db
+def test_identity_map():
+    instance = TestChangedModel.objects.create(text="test")
+    with identity_map() as cache:
+        with CaptureQueriesContext(connection) as queries:
+            assert get_object_or_make(TestChangedModel, text="test") == (
+                instance, True)
+            found, exists = get_object_or_make(TestChangedModel, text="test")
+            assert found is not instance
+            assert get_object_or_make(TestChangedModel, text="test") == (
+                found, True)
+            assert get_object_or_make_many(TestChangedModel, [
+                {"text": "test"}]) == [(found, True)]
+            missing, exists = get_object_or_make(TestChangedModel, text="new")
+            assert exists is False
+            missing, exists = get_object_or_make(TestChangedModel, text="new")
+            assert exists is False
+        assert len(queries) == 2
+        assert (cache.hits, cache.misses) == (4, 2)
+
+        missing.save()
+        assert get_object_or_make(TestChangedModel, text="new") == (
+            missing, True)
+        found.text = "changed"
+        found.save()
+        assert get_object_or_make(TestChangedModel, text="test")[1] is False
+    assert cache.misses == 4
+
+
+@pytest.mark.django_db
+def test_identity_map_many():
+    instance = TestChangedModel.objects.create(text="test")
+    with identity_map() as cache:
+        get_object_or_make(TestChangedModel, text="test")
+        with CaptureQueriesContext(connection) as queries:
+            results = get_object_or_make_many(TestChangedModel, [
+                {"text": "test"}, {"text": "new"}, {"text": "new"}])
+        assert len(queries) == 1
+        assert results[0] == (instance, True)
+        assert results[1][0] is results[2][0]
+        assert get_object_or_make(TestChangedModel, text="new")[1] is False
+    assert cache.hits == 2
+
+
+@pytest.mark.django_db(transaction=True)
+def test_get_object_or_make_lookup_cache():
+    cache.clear()
+    with CaptureQueriesContext(connection) as queries:
+        for _ in range(2):
+            instance, exists = get_object_or_make(TestCachedModel, text="test")
+            assert exists is False
+    assert len(queries) == 1
+
+    instance.save()
+    with CaptureQueriesContext(connection) as queries:
+        for _ in range(2):
+            assert get_object_or_make(TestCachedModel, text="test") == (
+                instance, True)
+    assert len(queries) == 1
+
+    instance.delete()
+    assert get_object_or_make(TestCachedModel, text="test")[1] is False
+
+
+@pytest.mark.django_db(transaction=True)
+def test_bulk_save_expires_lookups():
+    cache.clear()
+    TestCachedChangedModel.objects.create(text="test")
+    with identity_map() as lookups:
+        found, exists = get_object_or_make(TestCachedChangedModel, text="test")
+        found.title = "Title"
+        TestCachedChangedModel.objects.bulk_save([found])
+        found, exists = get_object_or_make(TestCachedChangedModel, text="test")
+        assert found.title == "Title"
+    assert lookups.misses == 2
+    found, exists = get_object_or_make(TestCachedChangedModel, text="test")
+    assert found.title == "Title"
+
+
+@pytest.mark.django_db(transaction=True)
+def test_lookup_cache_expires_on_commit():
+    cache.clear()
+    instance = TestCachedModel.objects.create(text="test")
+    version = get_lookup_cache_version(TestCachedModel)
+    with transaction.atomic():
+        instance.save()
+        assert get_lookup_cache_version(TestCachedModel) == version + 1
+    # Lookups cached while the transaction was open are expired too
+    assert get_lookup_cache_version(TestCachedModel) == version + 2
+    instance.save()
+    assert get_lookup_cache_version(TestCachedModel) == version + 3
+
+
+@pytest.mark.django_db(transaction=True)
+def test_lookup_cache_rollback():
+    cache.clear()
+    with pytest.raises(ValueError):
+        with transaction.atomic():
+            instance = TestCachedModel.objects.create(text="test")
+            assert get_object_or_make(TestCachedModel, text="test") == (
+                instance, True)
+            raise ValueError
+    assert get_object_or_make(TestCachedModel, text="test")[1] is False
+
+
+@pytest.mark.django_db(transaction=True)
+def test_aget_object_or_make():
+    asyncio = pytest.importorskip("asyncio")
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    try:
+        instance = TestChangedModel(text="test")
+        loop.run_until_complete(instance.asave())
+        assert instance.pk is not None
+        assert loop.run_until_complete(aget_object_or_make(
+            TestChangedModel, text="test")) == (instance, True)
+        results = loop.run_until_complete(aget_object_or_make_many(
+            TestChangedModel,
+            [{"text": "test"}, {"text": "new"}, {"text": "test"}],
+            batch_size=2))
+        assert [exists for _, exists in results] == [True, False, True]
+        assert results[1][0].text == "new"
+    finally:
+        loop.close()
+        asyncio.set_event_loop(None)
+
+
+@pytest.mark.django_db
+def test_get_object_or_make_or_create():
+    instance, created = get_object_or_make_or_create(
+        TestUniqueModel, slug="hello", defaults={"text": "Hello"})
+    assert created is True
+    assert instance.pk is not None
+    assert instance.has_changed is False
+    assert TestUniqueModel.objects.get(slug="hello").text == "Hello"
+
+    found, created = get_object_or_make_or_create(
+        TestUniqueModel, slug="hello", defaults={"text": "Bye"})
+    assert (found, created) == (instance, False)
+    assert found.text == "Hello"
+
+
+@pytest.mark.django_db
+def test_get_object_or_make_or_create_many():
+    existing = TestUniqueModel.objects.create(text="One", slug="one")
+    results = get_object_or_make_or_create_many(
+        TestUniqueModel,
+        [{"slug": "one"}, {"slug": "two"}, {"slug": "two"}],
+        [{"text": "Uno"}, {"text": "Dos"}, {"text": "Dos"}])
+    assert results[0] == (existing, False)
+    assert results[1][1] is True
+    assert results[1] == results[2]
+    assert TestUniqueModel.objects.count() == 2
+
+
+@pytest.mark.django_db
+def test_get_object_or_make_or_create_conflict():
+    existing = TestUniqueModel.objects.create(text="One", slug="one")
+    # Someone else inserts the row between the lookup and the insert
+    missing = [(TestUniqueModel(slug="one"), False)]
+    with mock.patch("trackmaven_django.query.get_object_or_make_many",
+                    return_value=missing):
+        instance, created = get_object_or_make_or_create(
+            TestUniqueModel, slug="one", defaults={"text": "Uno"})
+    assert (instance, created) == (existing, False)
+    assert instance.text == "One"
+    assert TestUniqueModel.objects.count() == 1
+
+
+@pytest.mark.django_db
+def test_get_object_or_make_or_create_other_conflict():
+    TestTwoUniqueModel.objects.create(text="Old", url="old", slug="taken")
+    for sqlite_version_info in ((3, 24, 0), (3, 8, 0)):
+        with mock.patch.object(connection.Database, "sqlite_version_info",
+                               sqlite_version_info):
+            # Only conflicts on the lookup fields are ignored
+            with pytest.raises(IntegrityError):
+                with transaction.atomic():
+                    get_object_or_make_or_create(
+                        TestTwoUniqueModel, url="new",
+                        defaults={"text": "New", "slug": "taken"})
+            instance, created = get_object_or_make_or_create(
+                TestTwoUniqueModel, url="old",
+                defaults={"text": "Old", "slug": "other"})
+            assert (instance.slug, created) == ("taken", False)
+    assert TestTwoUniqueModel.objects.count() == 1
+
+
+def test_get_object_or_make_or_create_many_defaults():
+    with pytest.raises(ValueError):
+        get_object_or_make_or_create_many(
+            TestUniqueModel, [{"slug": "one"}, {"slug": "two"}], [{}])
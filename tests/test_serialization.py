@@ -0,0 +1,75 @@
+import pickle
+
+from .models import (
+    TestBaseModel, TestChangedModel, TestLazyChangedModel,
+    TestSnapshotChangedModel)
+from trackmaven_django.models import DEFERRED
+from trackmaven_django.serialization import (
+    deserialize, deserialize_many, serialize, serialize_many)
+
+import pytest
+
+
+@pytest.mark.django_db
+def test_serialize():
+    for model in (TestChangedModel, TestSnapshotChangedModel,
+                  TestLazyChangedModel):
+        instance = model.objects.create(text="Hello")
+        data = serialize(instance)
+        assert len(data) < len(pickle.dumps(instance, 2))
+        copy = deserialize(data)
+        assert type(copy) is model
+        assert (copy.pk, copy.text) == (instance.pk, "Hello")
+        assert copy._state.adding is False
+        assert copy._state.db == 'default'
+        assert copy.has_changed is False
+
+        # The change tracking state is kept
+        instance.text = "Bye"
+        copy = deserialize(serialize(instance))
+        assert copy.text == "Bye"
+        assert copy.diff == {"text": ("Hello", "Bye")}
+
+        copy = deserialize(serialize(model(text="New")))
+        assert copy.pk is None
+        assert copy._state.adding is True
+
+
+@pytest.mark.django_db
+def test_serialize_deferred():
+    pk = TestSnapshotChangedModel.objects.create(text="Hello").pk
+    instance = TestSnapshotChangedModel.objects.only('id').get(pk=pk)
+    copy = deserialize(serialize(instance))
+    assert copy.get_deferred_fields() == {'text'}
+    assert copy.text == "Hello"
+
+    instance = TestSnapshotChangedModel.objects.only('id').get(pk=pk)
+    instance.text = "Bye"
+    copy = deserialize(serialize(instance))
+    assert copy.diff == {"text": (DEFERRED, "Bye")}
+
+    instance = TestSnapshotChangedModel.objects.only('id').get(pk=pk)
+    instance.text
+    instance.text = "Bye"
+    copy = deserialize(serialize(instance))
+    assert copy.diff == {"text": ("Hello", "Bye")}
+
+
+@pytest.mark.django_db
+def test_serialize_many():
+    TestBaseModel.objects.create(text="Hello")
+    TestChangedModel.objects.create(text="Bye")
+    instances = (
+        list(TestBaseModel.objects.all()) +
+        list(TestChangedModel.objects.all()))
+    copies = deserialize_many(serialize_many(instances))
+    assert [(type(copy), copy.pk, copy.text) for copy in copies] == [
+        (type(instance), instance.pk, instance.text)
+        for instance in instances]
+    assert deserialize_many(serialize_many([])) == []
+
+
+def test_deserialize_stale_payload():
+    data = pickle.dumps((1, [('tests.TestBaseModel', 0, [])]), 2)
+    with pytest.raises(ValueError):
+        deserialize_many(data)
@@ -0,0 +1,33 @@
+from django.db import transaction
+from trackmaven_django.transactions import TransactionBuffer
+
+import pytest
+
+
+@pytest.mark.django_db(transaction=True)
+def test_transaction_buffer():
+    flushed = []
+    buffer = TransactionBuffer(flushed.append)
+
+    buffer.add([1])
+    assert flushed == [[1]]
+
+    with transaction.atomic():
+        buffer.add([2])
+        buffer.add([3, 4])
+        try:
+            with transaction.atomic():
+                buffer.add([5])
+                raise ValueError
+        except ValueError:
+            pass
+        assert flushed == [[1]]
+    assert flushed == [[1], [2, 3, 4]]
+
+    try:
+        with transaction.atomic():
+            buffer.add([6])
+            raise ValueError
+    except ValueError:
+        pass
+    assert flushed == [[1], [2, 3, 4]]
@@ -0,0 +1,48 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from trackmaven_django.validation import validate_many
+
+from .models import TestUniqueModel
+
+import pytest
+
+
+@pytest.mark.django_db
+def test_validate_many():
+    existing = TestUniqueModel.objects.create(text="Hello", slug="taken")
+    existing.text = "Bye"
+    instances = [
+        TestUniqueModel(text="Hello", slug="taken"),
+        TestUniqueModel(text="Hello", slug="free"),
+        TestUniqueModel(text="Hello", slug="free"),
+        TestUniqueModel(text="Hello" * 100, slug="not a slug"),
+        existing,
+        TestUniqueModel.objects.get(pk=existing.pk),
+    ]
+    with CaptureQueriesContext(connection) as queries:
+        errors = validate_many(instances)
+    assert len(queries) == 1
+    assert [sorted(error) for error in errors] == [
+        ['slug'], [], ['slug'], ['slug', 'text'], [], []]
+    assert errors[0]['slug'] == [
+        'Test unique model with this Slug already exists.']
+
+    instances[-1].slug = "free"
+    errors = validate_many(instances[1:2] + instances[-1:])
+    assert [sorted(error) for error in errors] == [[], ['slug']]
+    assert validate_many([]) == []
+
+
+@pytest.mark.django_db
+def test_validate_many_in_processes():
+    TestUniqueModel.objects.create(text="Hello", slug="taken")
+    instances = [
+        TestUniqueModel(text="Hello", slug=slug)
+        for slug in ("taken", "one", "one", "not a slug", "two")]
+    instances[-1].id = "42"
+    errors = validate_many(instances, processes=2, chunk_size=2)
+    # Values cleaned by the workers are set
+    assert instances[-1].id == 42
+    assert [sorted(error) for error in errors] == [
+        ['slug'], [], ['slug'], ['slug'], []]
+    assert errors == validate_many(instances)
@@ -0,0 +1,114 @@
+"""
+Capture of the changes saved by `ChangedModelMixin` models, e.g. for audit
+trails.
+
+Models opt in by setting `change_log` to a sink, an object with a
+`write(events)` method. The diff of every `save` becomes one `ChangeEvent`
+per changed field, and the events of a transaction are written to the sink
+in one call once it commits, see `transactions.TransactionBuffer`. Like
+`ChangedModelMixin.diff`, the values an instance was created with aren't
+changes.
+
+Example:
+
+    ::
+
+        from trackmaven_django.changelog import AbstractChangeEvent, ModelSink
+
+        class PostChange(AbstractChangeEvent):
+            pass
+
+        class Post(ChangedModel):
+            change_log = ModelSink('blog.PostChange')
+
+"""
+import threading
+from collections import namedtuple
+
+from django.apps import apps
+from django.db import models
+from django.utils import six, timezone
+from django.utils.encoding import force_text
+
+from .transactions import TransactionBuffer
+
+ChangeEvent = namedtuple(
+    'ChangeEvent', ['model', 'pk', 'field', 'old', 'new'])
+
+_buffers = {}
+_lock = threading.Lock()
+
+
+def _get_buffer(sink):
+    with _lock:
+        try:
+            return _buffers[sink]
+        except KeyError:
+            _buffers[sink] = buffer = TransactionBuffer(sink.write)
+            return buffer
+
+
+def record_changes(instance, diff):
+    """
+    Adds the events of `diff`, the changes `instance` was just saved with, to
+    the sink of its model.
+    """
+    if not diff:
+        return
+    label = instance._meta.concrete_model._meta.label
+    pk = instance.pk
+    events = [
+        ChangeEvent(label, pk, name, old, new)
+        for name, (old, new) in sorted(diff.items())]
+    _get_buffer(instance.change_log).add(events, instance._state.db)
+
+
+class AbstractChangeEvent(models.Model):
+    """
+    Abstract model storing a `ChangeEvent`, written by `ModelSink`. Values
+    are stored as text.
+    """
+    model = models.CharField(max_length=100, db_index=True)
+    object_pk = models.CharField(max_length=255, db_index=True)
+    field = models.CharField(max_length=100)
+    old = models.TextField(null=True)
+    new = models.TextField(null=True)
+    created = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        abstract = True
+
+    @classmethod
+    def from_event(cls, event):
+        return cls(
+            model=event.model, object_pk=force_text(event.pk),
+            field=event.field, old=_to_text(event.old),
+            new=_to_text(event.new))
+
+
+def _to_text(value):
+    if value is None:
+        return value
+    return force_text(value)
+
+
+class ModelSink(object):
+    """
+    Sink writing the events of a transaction with one `bulk_create` of
+    `model`, a subclass of `AbstractChangeEvent` or its label.
+    """
+
+    def __init__(self, model, using=None):
+        self._model = model
+        self.using = using
+
+    @property
+    def model(self):
+        if isinstance(self._model, six.string_types):
+            self._model = apps.get_model(self._model)
+        return self._model
+
+    def write(self, events):
+        model = self.model
+        model.objects.using(self.using).bulk_create(
+            [model.from_event(event) for event in events])
@@ -0,0 +1,68 @@
+import functools
+import threading
+
+from django.conf import settings
+from django.db import close_old_connections
+
+_executor = None
+_lock = threading.Lock()
+
+
+def get_executor():
+    """
+    Returns the thread pool the async helpers run blocking database work in.
+
+    Its size is bounded by the `TRACKMAVEN_DJANGO_ASYNC_WORKERS` setting,
+    which defaults to 4, so fanning out lookups can't use up the threads of
+    the event loop's default executor or open unbounded connections.
+    """
+    global _executor
+    with _lock:
+        if _executor is None:
+            from concurrent.futures import ThreadPoolExecutor
+            _executor = ThreadPoolExecutor(max_workers=getattr(
+                settings, 'TRACKMAVEN_DJANGO_ASYNC_WORKERS', 4))
+    return _executor
+
+
+def run_in_executor(func, *args, **kwargs):
+    """
+    Runs `func` in the pool returned by `get_executor` and returns an
+    `asyncio` future of its result, which can be awaited. Requires Python 3.
+
+    Example:
+
+        >>> post = await run_in_executor(Post.objects.get, pk=1)
+
+    """
+    import asyncio
+    loop = asyncio.get_event_loop()
+    return loop.run_in_executor(
+        get_executor(), functools.partial(_run, func, args, kwargs))
+
+
+def chain(future, func):
+    """
+    Returns an `asyncio` future of `func` applied to the result of `future`.
+    """
+    import asyncio
+    result = asyncio.Future()
+
+    def done(future):
+        if future.cancelled():
+            result.cancel()
+        elif future.exception() is not None:
+            result.set_exception(future.exception())
+        else:
+            result.set_result(func(future.result()))
+    future.add_done_callback(done)
+    return result
+
+
+def _run(func, args, kwargs):
+    try:
+        return func(*args, **kwargs)
+    finally:
+        # Like at the end of a request, close connections that are broken or
+        # past CONN_MAX_AGE
+        close_old_connections()
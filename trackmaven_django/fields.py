@@ -1,6 +1,13 @@
+import re
+
 from django.db import models
-from django.core import exceptions
+from django.core import checks, exceptions
 from django import forms
+from django.utils import six
+try:
+    from django.core.exceptions import EmptyResultSet
+except ImportError:
+    from django.db.models.sql.datastructures import EmptyResultSet
 from django.utils.text import capfirst
 
 
@@ -8,6 +15,55 @@ class MultiSelectFormField(forms.MultipleChoiceField):
     widget = forms.SelectMultiple
 
 
+class ChoiceValues(tuple):
+    """
+    Immutable list of choices returned by a `MultipleChoiceField` with
+    `frozen` set. It compares equal to a list with the same items.
+    """
+    __slots__ = ()
+
+    def __eq__(self, other):
+        if isinstance(other, list):
+            other = tuple(other)
+        return tuple.__eq__(self, other)
+
+    def __ne__(self, other):
+        equal = self.__eq__(other)
+        return equal if equal is NotImplemented else not equal
+
+    __hash__ = tuple.__hash__
+
+
+class ChoiceIndex(object):
+    """
+    Lookup tables for the choices of a `MultipleChoiceField`, built once from
+    its flattened choices.
+    """
+
+    def __init__(self, choices):
+        #: The choice values, in order.
+        self.values = tuple(value for value, label in choices)
+        #: Maps each choice value to its position.
+        self.positions = dict(
+            (value, position) for position, value in enumerate(self.values))
+        #: Maps each choice value to its label.
+        self.labels = dict(choices)
+        #: Maps each choice value to the value itself, to share one string.
+        self.interned = dict((value, value) for value in self.values)
+
+    def invalid(self, values):
+        """
+        Returns the values that aren't valid choices.
+        """
+        positions = self.positions
+        return [value for value in values if value not in positions]
+
+    def display(self, values):
+        labels = self.labels
+        return ",".join([
+            six.text_type(labels.get(value, value)) for value in values])
+
+
 class MultipleChoiceField(models.Field):
     """
     Django Custom Field for MultipleChoiceField
@@ -23,13 +79,60 @@ class MultipleChoiceField(models.Field):
           class ExampleModel(models.Model):
           channels = MultipleChoiceField(default='facebook,twitter,instagram',
                                    choices=settings.VALID_CHANNEL_NAMES)
+
+    The `storage` argument picks how the list is stored in the database:
+
+    - ``'text'`` (default): a comma-separated `TextField`.
+    - ``'array'``: a PostgreSQL ``text[]`` column, which a GIN index can be
+      created on, e.g. with a `RunSQL` migration.
+    - ``'bitmask'``: a `BigIntegerField` with one bit per choice, in the
+      order of `choices`. At most 63 choices are supported and choices must
+      not be reordered once rows are stored.
+
+    With `frozen` set, values are `ChoiceValues` tuples instead of lists.
+    Their items are the choice values themselves and values are cached by
+    their database value, so rows with the same choices share one object.
     """
     description = "A Django Custom field for storing a list of pre-set choices"
     __metaclass__ = models.SubfieldBase
 
+    STORAGES = ('text', 'array', 'bitmask')
+    MAX_BITMASK_CHOICES = 63
+    FROZEN_CACHE_SIZE = 1024
+
     def __init__(self, *args, **kwargs):
+        self.storage = kwargs.pop('storage', 'text')
+        self.frozen = kwargs.pop('frozen', False)
+        self._frozen_cache = {}
+        if self.storage not in self.STORAGES:
+            raise ValueError('Storage {} not supported.'.format(self.storage))
         super(MultipleChoiceField, self).__init__(*args, **kwargs)
 
+    def check(self, **kwargs):
+        errors = super(MultipleChoiceField, self).check(**kwargs)
+        errors.extend(self._check_storage())
+        return errors
+
+    def _check_storage(self):
+        if (self.storage == 'bitmask' and
+                len(self.flatchoices) > self.MAX_BITMASK_CHOICES):
+            return [checks.Error(
+                "'bitmask' storage supports at most {} choices.".format(
+                    self.MAX_BITMASK_CHOICES),
+                obj=self,
+                id='trackmaven_django.E001',
+            )]
+        return []
+
+    def deconstruct(self):
+        name, path, args, kwargs = super(
+            MultipleChoiceField, self).deconstruct()
+        if self.storage != 'text':
+            kwargs['storage'] = self.storage
+        if self.frozen:
+            kwargs['frozen'] = True
+        return name, path, args, kwargs
+
     def formfield(self, **kwargs):
         defaults = {'required': not self.blank,
                     'label': capfirst(self.verbose_name),
@@ -40,29 +143,109 @@ class MultipleChoiceField(models.Field):
         return MultiSelectFormField(**defaults)
 
     def get_internal_type(self):
+        if self.storage == 'bitmask':
+            return "BigIntegerField"
         # DB wise it is stored and handled just like a TextField
         return "TextField"
 
+    def db_type(self, connection):
+        if self.storage == 'array':
+            if connection.vendor != 'postgresql':
+                raise exceptions.ImproperlyConfigured(
+                    "'array' storage requires PostgreSQL.")
+            return 'text[]'
+        return super(MultipleChoiceField, self).db_type(connection)
+
+    def from_db_value(self, value, expression, connection, context):
+        if value is None:
+            return value
+        return self.to_python(value)
+
     def to_python(self, value):
+        if self.frozen:
+            return self._to_frozen(value)
         if isinstance(value, list):
             return value
+        elif isinstance(value, six.integer_types):
+            return self._from_bitmask(value)
         else:
             return value.split(',')
 
-    def get_prep_value(self, value):
-        if (isinstance(value, str) or
-                isinstance(value, bytes) or isinstance(value, bytearray)):
+    def _to_frozen(self, value):
+        if isinstance(value, ChoiceValues):
             return value
-        elif isinstance(value, list):
+        if isinstance(value, (list, tuple)):
+            key = tuple(value)
+        else:
+            key = value
+        cache = self._frozen_cache
+        try:
+            return cache[key]
+        except KeyError:
+            pass
+        if isinstance(value, (list, tuple)):
+            values = value
+        elif isinstance(value, six.integer_types):
+            values = self._from_bitmask(value)
+        else:
+            values = value.split(',')
+        interned = self.choice_index.interned
+        result = ChoiceValues(interned.get(item, item) for item in values)
+        if len(cache) >= self.FROZEN_CACHE_SIZE:
+            cache.clear()
+        cache[key] = result
+        return result
+
+    def get_prep_value(self, value):
+        if isinstance(value, (six.string_types, bytes, bytearray)):
+            if self.storage == 'text':
+                return value
+            value = self.to_python(value)
+        if isinstance(value, (list, tuple)):
+            if self.storage == 'array':
+                return list(value)
+            elif self.storage == 'bitmask':
+                return self._to_bitmask(value)
             return ','.join(value)
+        elif isinstance(value, six.integer_types) and self.storage == 'bitmask':
+            return value
         else:
             raise Exception('Invalid value type')
 
+    @property
+    def choice_index(self):
+        """
+        The `ChoiceIndex` of the field, built when the field is added to its
+        model.
+        """
+        try:
+            return self._choice_index
+        except AttributeError:
+            self._choice_index = ChoiceIndex(self.flatchoices)
+            return self._choice_index
+
+    def _to_bitmask(self, values):
+        positions = self.choice_index.positions
+        mask = 0
+        for value in values:
+            try:
+                mask |= 1 << positions[value]
+            except KeyError:
+                raise ValueError('Invalid choice {}.'.format(value))
+        return mask
+
+    def _from_bitmask(self, mask):
+        values = self.choice_index.values
+        return [value for position, value in enumerate(values)
+                if mask & (1 << position)]
+
     def get_prep_lookup(self, lookup_type, value):
         if lookup_type == 'exact':
             return self.get_prep_value(value)
         elif lookup_type == 'in':
             return [self.get_prep_value(v) for v in value]
+        elif lookup_type in ('contains', 'overlap', 'contained_by'):
+            return list(self.to_python(value))
         else:
             raise TypeError(
                     'Lookup type {} not supported.'.format(lookup_type))
@@ -79,16 +262,109 @@ class MultipleChoiceField(models.Field):
     def contribute_to_class(self, cls, name):
         # Fixes get_field_display for multiple choice fields
         super(MultipleChoiceField, self).contribute_to_class(cls, name)
+        self._choice_index = ChoiceIndex(self.flatchoices)
+        self._frozen_cache = {}
         if self.choices:
             func = (lambda self, fieldname=name,
-                    choicedict=dict(self.choices): ",".join(
-                        [choicedict.get(value, value) for value in getattr(
-                            self, fieldname)]))
+                    index=self._choice_index: index.display(
+                        getattr(self, fieldname)))
             setattr(cls, 'get_%s_display' % self.name, func)
 
     def validate(self, value, model_instance):
-        arr_choices = self.get_choices_selected(self.get_choices_default())
-        for choice in value:
-            if choice not in arr_choices:
-                raise exceptions.ValidationError(
-                        'invalid_choice: %s' % value)
+        if not self.choices:
+            return
+        invalid = self.choice_index.invalid(value)
+        if invalid:
+            raise exceptions.ValidationError(
+                    'invalid_choice: %s' % ', '.join(invalid),
+                    code='invalid_choice')
+
+
+class ChoiceLookup(models.Lookup):
+    """
+    Base class of the lookups comparing a `MultipleChoiceField` to a list of
+    choices, compiled according to the field's storage:
+
+    - ``'text'``: regular expressions matching whole comma-separated items.
+    - ``'array'``: PostgreSQL array operators, which can use a GIN index.
+    - ``'bitmask'``: bitwise operators against the mask of the choices.
+    """
+    array_operator = None
+
+    def as_sql(self, compiler, connection):
+        lhs, params = self.process_lhs(compiler, connection)
+        field = self.lhs.output_field
+        if field.storage == 'array':
+            return ('{} {} %s::text[]'.format(lhs, self.array_operator),
+                    params + [self.rhs])
+        elif field.storage == 'bitmask':
+            return self.as_bitmask(lhs, params, field._to_bitmask(self.rhs))
+        return self.as_text(lhs, params, connection)
+
+    def regex(self, lhs, connection):
+        return '{} {}'.format(lhs, connection.operators['regex'] % '%s')
+
+    def choices_pattern(self):
+        return '({})'.format('|'.join(re.escape(value) for value in self.rhs))
+
+
+class ChoiceContains(ChoiceLookup):
+    """
+    Matches rows having all the given choices, e.g.
+    ``Post.objects.filter(channels__contains=['facebook', 'twitter'])``.
+    """
+    lookup_name = 'contains'
+    array_operator = '@>'
+
+    def as_bitmask(self, lhs, params, mask):
+        return '({} & %s) = %s'.format(lhs), params + [mask, mask]
+
+    def as_text(self, lhs, params, connection):
+        if not self.rhs:
+            return '1 = 1', []
+        sql = ' AND '.join([self.regex(lhs, connection)] * len(self.rhs))
+        sql_params = []
+        for value in self.rhs:
+            sql_params += params + ['(^|,){}(,|$)'.format(re.escape(value))]
+        return '({})'.format(sql), sql_params
+
+
+class ChoiceOverlap(ChoiceLookup):
+    """
+    Matches rows having any of the given choices, e.g.
+    ``Post.objects.filter(channels__overlap=['facebook', 'twitter'])``.
+    """
+    lookup_name = 'overlap'
+    array_operator = '&&'
+
+    def as_bitmask(self, lhs, params, mask):
+        return '({} & %s) <> 0'.format(lhs), params + [mask]
+
+    def as_text(self, lhs, params, connection):
+        if not self.rhs:
+            raise EmptyResultSet
+        pattern = '(^|,){}(,|$)'.format(self.choices_pattern())
+        return self.regex(lhs, connection), params + [pattern]
+
+
+class ChoiceContainedBy(ChoiceLookup):
+    """
+    Matches rows only having choices among the given ones, e.g.
+    ``Post.objects.filter(channels__contained_by=['facebook', 'twitter'])``.
+    """
+    lookup_name = 'contained_by'
+    array_operator = '<@'
+
+    def as_bitmask(self, lhs, params, mask):
+        return '({} | %s) = %s'.format(lhs), params + [mask, mask]
+
+    def as_text(self, lhs, params, connection):
+        if not self.rhs:
+            return "{} = ''".format(lhs), params
+        pattern = '^({0}(,{0})*)?$'.format(self.choices_pattern())
+        return self.regex(lhs, connection), params + [pattern]
+
+
+MultipleChoiceField.register_lookup(ChoiceContains)
+MultipleChoiceField.register_lookup(ChoiceOverlap)
+MultipleChoiceField.register_lookup(ChoiceContainedBy)
@@ -0,0 +1,174 @@
+"""
+Hooks reporting the time and number of queries spent in the models and query
+helpers of trackmaven_django.
+
+Callbacks are called with the label of the model, the operation, its
+duration in seconds and the number of queries it ran:
+
+- ``'snapshot'``: recording the initial state of a `ChangedModelMixin`.
+- ``'diff'``: comparing a `ChangedModelMixin` to its initial state.
+- ``'validate'``: validating a `BaseModel` before saving it.
+- ``'save'``: saving a `BaseModel` or `ChangedModelMixin`.
+- ``'bulk_save'``: `ChangedModelQuerySet.bulk_save`.
+- ``'lookup'``: `query.get_object_or_make` and friends.
+
+Queries are counted by wrapping the cursors of the connection during the
+measurement, without `DEBUG` or the query log. When no callback is
+registered, measuring costs a function call.
+
+Example:
+
+    >>> def log_slow(model, operation, duration, queries):
+    ...     if duration > 0.1:
+    ...         logger.warning("%s %s took %.3fs", model, operation, duration)
+    >>> instrumentation.register(log_slow)
+
+"""
+import threading
+from collections import namedtuple
+from timeit import default_timer
+
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.backends.utils import CursorWrapper
+
+#: The registered callbacks.
+callbacks = []
+
+_local = threading.local()
+
+Measurement = namedtuple(
+    'Measurement', ['model', 'operation', 'duration', 'queries'])
+
+
+def register(callback):
+    """
+    Registers `callback`, see the module documentation for its arguments.
+    """
+    callbacks.append(callback)
+
+
+def unregister(callback):
+    callbacks.remove(callback)
+
+
+class _NoMeasure(object):
+    def __enter__(self):
+        pass
+
+    def __exit__(self, *exc_info):
+        pass
+
+
+_NO_MEASURE = _NoMeasure()
+
+
+class _CountingCursorWrapper(CursorWrapper):
+    """
+    Wraps the cursors of a connection during a measurement to count the
+    queries run with them.
+    """
+
+    def __init__(self, cursor, db, measurement):
+        super(_CountingCursorWrapper, self).__init__(cursor, db)
+        self.measurement = measurement
+
+    def callproc(self, procname, params=None):
+        self.measurement.queries += 1
+        return super(_CountingCursorWrapper, self).callproc(procname, params)
+
+    def execute(self, sql, params=None):
+        self.measurement.queries += 1
+        return super(_CountingCursorWrapper, self).execute(sql, params)
+
+    def executemany(self, sql, param_list):
+        self.measurement.queries += 1
+        return super(_CountingCursorWrapper, self).executemany(
+            sql, param_list)
+
+
+class _Measure(object):
+    def __init__(self, key, using):
+        self.key = key
+        self.connection = connections[using or DEFAULT_DB_ALIAS]
+
+    def __enter__(self):
+        _local.active.add(self.key)
+        self.queries = 0
+        # Cursors are wrapped only while measuring, which nested
+        # measurements do in turn
+        connection = self.connection
+        self.patched_cursor = connection.__dict__.get('cursor')
+        cursor = connection.cursor
+        connection.cursor = lambda: _CountingCursorWrapper(
+            cursor(), connection, self)
+        self.start = default_timer()
+
+    def __exit__(self, *exc_info):
+        duration = default_timer() - self.start
+        if self.patched_cursor is None:
+            del self.connection.cursor
+        else:
+            self.connection.cursor = self.patched_cursor
+        _local.active.discard(self.key)
+        model, operation = self.key
+        for callback in list(callbacks):
+            callback(model, operation, duration, self.queries)
+
+
+def measure(model, operation, using=None):
+    """
+    Returns a context manager reporting the duration and queries of its block
+    to the callbacks. `model` is a model class or instance. A measurement
+    nested in one of the same model and operation, e.g. the `save` of a
+    parent class, isn't reported separately.
+
+    Example:
+
+        >>> with measure(post, 'save'):
+        ...     post.save()
+
+    """
+    if not callbacks:
+        return _NO_MEASURE
+    key = (model._meta.concrete_model._meta.label, operation)
+    active = _local.__dict__.setdefault('active', set())
+    if key in active:
+        return _NO_MEASURE
+    return _Measure(key, using)
+
+
+class Collector(object):
+    """
+    Callback keeping the measurements in memory, e.g. for tests.
+
+    Example:
+
+        >>> with Collector() as collector:
+        ...     post.save()
+        >>> collector.filter(operation='save')
+        [Measurement(model='blog.Post', operation='save', ...)]
+
+    """
+
+    def __init__(self):
+        self.measurements = []
+
+    def __call__(self, model, operation, duration, queries):
+        self.measurements.append(
+            Measurement(model, operation, duration, queries))
+
+    def __enter__(self):
+        register(self)
+        return self
+
+    def __exit__(self, *exc_info):
+        unregister(self)
+
+    def filter(self, model=None, operation=None):
+        """
+        Returns the measurements of a model label and/or operation.
+        """
+        return [
+            measurement for measurement in self.measurements
+            if (model is None or measurement.model == model) and
+            (operation is None or measurement.operation == operation)]
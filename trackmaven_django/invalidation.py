@@ -0,0 +1,83 @@
+"""
+Callbacks run when some fields of `ChangedModelMixin` models are saved, e.g.
+to expire the cache entries derived from them.
+
+A callback registered for some fields of a model is called when instances
+are saved with changes to any of those fields, once per transaction with the
+list of those instances, after the transaction commits. Changes to other
+fields, e.g. counters, don't call it.
+
+Example:
+
+    >>> @on_change(Post, ['title', 'url'])
+    ... def expire_post_pages(posts):
+    ...     cache.delete_many([page_key(post.pk) for post in posts])
+
+Callbacks are called from `ChangedModelMixin.save` and
+`ChangedModelQuerySet.bulk_save`, without signals.
+"""
+from collections import OrderedDict
+
+from .transactions import TransactionBuffer
+
+_callbacks = {}
+
+
+def register(model, fields, callback):
+    """
+    Registers `callback` to be called with the instances of `model` saved
+    with changes to any of `fields`, a list of field names.
+    """
+    names = frozenset(model._meta.get_field(name).name for name in fields)
+    _callbacks.setdefault(model._meta.concrete_model, []).append(
+        (names, callback))
+
+
+def unregister(model, callback):
+    model = model._meta.concrete_model
+    _callbacks[model] = [
+        (names, registered) for names, registered in _callbacks.get(model, [])
+        if registered is not callback]
+
+
+def on_change(model, fields):
+    """
+    Decorator registering a callback, see `register`.
+    """
+    def decorator(callback):
+        register(model, fields, callback)
+        return callback
+    return decorator
+
+
+def has_callbacks(model):
+    return bool(_callbacks.get(model._meta.concrete_model))
+
+
+def _flush(items):
+    # One call per callback, with each instance once, callbacks can be
+    # registered for several models
+    calls = OrderedDict()
+    for callback, instance in items:
+        instances = calls.setdefault(callback, OrderedDict())
+        instances[instance._meta.concrete_model, instance.pk] = instance
+    for callback, instances in calls.items():
+        callback(list(instances.values()))
+
+
+_buffer = TransactionBuffer(_flush)
+
+
+def changes_saved(instance, changed_fields):
+    """
+    Queues the callbacks registered for `changed_fields`, the fields
+    `instance` was just saved with.
+    """
+    changed_fields = set(changed_fields)
+    items = [
+        (callback, instance)
+        for names, callback in _callbacks.get(
+            instance._meta.concrete_model, ())
+        if not names.isdisjoint(changed_fields)]
+    if items:
+        _buffer.add(items, instance._state.db)
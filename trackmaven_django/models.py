@@ -1,7 +1,207 @@
-from django.db import models
-from django.forms.models import model_to_dict
+import time
+from collections import namedtuple
+from itertools import chain
+from operator import attrgetter
+
+from django.core.cache import caches
+from django.core.exceptions import NON_FIELD_ERRORS, ValidationError
+from django.db import DEFAULT_DB_ALIAS, connections, models, transaction
+from django.db.models import Case, Value, When
+from django.db.models.base import ModelState
+from django.db.models.query_utils import DeferredAttribute
+from django.db.models.signals import (
+    class_prepared, post_delete, post_init, post_save, pre_init)
+from django.dispatch import receiver
 from django.utils.encoding import force_text
 
+try:
+    from django.db.models import DEFERRED
+except ImportError:
+    class _Deferred(object):
+        def __repr__(self):
+            return '<Deferred field>'
+
+        def __reduce__(self):
+            # Unpickled as the module's instance
+            return 'DEFERRED'
+
+    DEFERRED = _Deferred()
+
+from .changelog import record_changes
+from .executor import run_in_executor
+from .invalidation import changes_saved, has_callbacks
+from .instrumentation import measure
+
+
+def _has_changed(old, new):
+    """
+    Compares two field values directly, only falling back to comparing their
+    text representations when the values are of different types, e.g. a
+    number assigned as a string.
+    """
+    if old == new:
+        return False
+    if type(old) is type(new):
+        return True
+    return force_text(old) != force_text(new)
+
+
+def _text_changed(old, new):
+    """
+    Compares the text representations of two field values, the comparison of
+    the ``'dict'`` tracking mode.
+    """
+    return force_text(old) != force_text(new)
+
+
+class _ModelFields(object):
+    """
+    Field metadata of a `ChangedModelMixin` or `BaseModel` subclass, built once
+    when the class is prepared and shared by all its instances, so that loops
+    over querysets don't walk `_meta` for every instance.
+    """
+
+    def __init__(self, model):
+        opts = model._meta
+        fields, deferred = _get_tracked_model_fields(model)
+        #: Names of the tracked fields, without the deferred ones.
+        self.names = tuple(field.name for field in fields)
+        #: Maps the attribute name of each tracked field to its name.
+        self.attnames = dict(
+            (field.attname, field.name) for field in fields)
+        #: Maps the attribute name of each tracked deferred field to its name.
+        self.deferred_attnames = dict(
+            (field.attname, field.name) for field in deferred)
+        #: Function returning the values of the tracked fields as a tuple.
+        self.get_values = _make_getter(field.attname for field in fields)
+        #: Names and attribute names of the concrete fields, in the order of
+        #: the columns.
+        self.concrete_field_attnames = tuple(
+            (field.name, field.attname) for field in opts.concrete_fields)
+        self.concrete_attnames = tuple(
+            attname for name, attname in self.concrete_field_attnames)
+        #: Function returning the values of the concrete fields as a tuple.
+        self.get_concrete_values = _make_getter(self.concrete_attnames)
+        #: Names and attribute names of all the fields, as validated by
+        #: `full_clean`.
+        self.field_attnames = tuple(
+            (field.name, field.attname) for field in opts.fields)
+        self.field_names = tuple(name for name, attname in self.field_attnames)
+        #: Fields of `ChangedModelMixin.to_dict`, as picked by `model_to_dict`.
+        self.dict_fields = tuple(
+            field for field in chain(opts.concrete_fields, opts.virtual_fields)
+            if field.editable and field.name in self.field_names)
+        #: The tracked fields among `dict_fields`.
+        self.tracked_dict_fields = tuple(
+            field for field in self.dict_fields if field.name in self.names)
+        #: Function telling whether a field value changed, for the
+        #: tracking mode of the model.
+        if getattr(model, 'tracking_mode', None) == 'dict':
+            self.has_changed = _text_changed
+        else:
+            self.has_changed = _has_changed
+        #: Names and attribute names of the other concrete fields but the
+        #: primary key, whose changes aren't known.
+        tracked_attnames = set(self.attnames).union(self.deferred_attnames)
+        self.untracked_attnames = tuple(
+            (field.name, field.attname) for field in opts.concrete_fields
+            if field.attname not in tracked_attnames and
+            not field.primary_key)
+        #: Attribute names of the concrete fields of 'lazy' models whose rows
+        #: are loaded without `Model.__init__`, see `ChangedModelMixin`.
+        self.row_attnames = None
+        if (getattr(model, 'tracking_mode', None) == 'lazy' and
+                not model._deferred and _inherits_model_init(model)):
+            self.row_attnames = self.concrete_attnames
+        #: Names of the fields whose value is set by `save`, e.g. `auto_now`
+        #: timestamps.
+        self.auto_now_names = tuple(
+            field.name for field in opts.concrete_fields
+            if getattr(field, 'auto_now', False))
+
+
+def _make_getter(attnames):
+    """
+    Returns a function returning the values of `attnames` of an instance as
+    a tuple.
+    """
+    attnames = tuple(attnames)
+    if not attnames:
+        return lambda instance: ()
+    elif len(attnames) == 1:
+        getter = attrgetter(attnames[0])
+        return lambda instance: (getter(instance),)
+    return attrgetter(*attnames)
+
+
+def _get_tracked_model_fields(model):
+    """
+    Returns the concrete fields of `model` selected by its `track_fields` and
+    `untrack_fields`, followed by the deferred ones among them.
+    """
+    opts = model._meta
+    track_fields = getattr(model, 'track_fields', None)
+    untrack_fields = getattr(model, 'untrack_fields', ())
+    for name in chain(track_fields or (), untrack_fields):
+        # Raises FieldDoesNotExist for a typo
+        opts.get_field(name)
+    fields = [
+        field for field in opts.concrete_fields
+        if (track_fields is None or field.name in track_fields) and
+        field.name not in untrack_fields]
+    # Same test as Model.get_deferred_fields, which is per class in Django
+    # 1.9, without walking the fields for every instance
+    deferred = [
+        field for field in fields
+        if isinstance(model.__dict__.get(field.attname), DeferredAttribute)]
+    return [field for field in fields if field not in deferred], deferred
+
+
+def _inherits_model_init(model):
+    """
+    Tells whether `ChangedModelMixin.__init__` is followed by
+    `Model.__init__` in the MRO of `model`.
+    """
+    mro = model.__mro__
+    for klass in mro[mro.index(ChangedModelMixin) + 1:]:
+        if klass is models.Model:
+            return True
+        if '__init__' in klass.__dict__:
+            return False
+    return False
+
+
+def _get_tracked_fields(model):
+    try:
+        return model.__dict__['_model_fields']
+    except KeyError:
+        # Model classes are prepared before they can be instantiated, this is
+        # only reached when calling it with another class
+        return _ModelFields(model)
+
+
+def _lazy_setattr(self, name, value):
+    """
+    `__setattr__` for models in the ``'lazy'`` tracking mode, recording the
+    original value of a field the first time it is assigned.
+    """
+    originals = self.__dict__.get('_ChangedModelMixin__initial')
+    if (originals is not None and name not in originals and
+            name in type(self)._model_fields.attnames):
+        originals[name] = getattr(self, name)
+    super(ChangedModelMixin, self).__setattr__(name, value)
+
+
+@receiver(class_prepared)
+def _prepare_changed_model(sender, **kwargs):
+    if not issubclass(sender, (ChangedModelMixin, BaseModel)):
+        return
+    # Deferred classes get their own, without their deferred fields
+    sender._model_fields = _ModelFields(sender)
+    if (issubclass(sender, ChangedModelMixin) and
+            sender.tracking_mode == 'lazy'):
+        sender.__setattr__ = _lazy_setattr
+
 
 class ChangedModelMixin(object):
     """
@@ -23,11 +223,95 @@ class ChangedModelMixin(object):
         >>> c.diff
         {'name': (None, 'Nike')}
 
+    By default the initial state is taken with `to_dict`. Setting
+    `tracking_mode` to ``'snapshot'`` records a tuple of the raw attribute
+    values of the concrete fields instead, which is much cheaper for models
+    loaded in bulk. In this mode foreign keys are reported by their
+    attribute values, e.g. the related object's primary key.
+
+    For models that are mostly read, ``'lazy'`` records nothing up front:
+    the original value of a field is only recorded the first time it is
+    assigned, and only the assigned fields are compared.
+
+    Example:
+
+        ::
+
+            class Post(ChangedModel):
+                tracking_mode = 'snapshot'
+
+    Setting `save_changed_fields_only` makes `save` only write the changed
+    fields of rows that already exist, and skip the UPDATE entirely when
+    nothing changed.
+
+    Setting `track_fields` to a list of field names only tracks those
+    fields, while `untrack_fields` excludes fields such as large text bodies
+    or timestamps. Untracked fields are never reported as changed, so
+    `save_changed_fields_only` and `bulk_save` always write the ones that
+    were loaded.
+    Fields deferred with `QuerySet.defer` or `QuerySet.only` are left out
+    of the initial state, so taking it doesn't load them. Their original
+    value is recorded when they are loaded, and a deferred field assigned
+    before being loaded is reported with `DEFERRED` as its original value.
+
+    Example:
+
+        >>> p = Post.objects.only('id').get(pk=1)
+        >>> p.url = "http://trackmaven.com"
+        >>> p.diff
+        {'url': (<Deferred field>, 'http://trackmaven.com')}
+
+    Setting `change_log` to a sink records the changes of every `save`, see
+    the `changelog` module. Callbacks can also be registered for changes to
+    some fields, see the `invalidation` module.
+
+    Example:
+
+        ::
+
+            class Post(ChangedModel):
+                untrack_fields = ['body', 'modified']
+
     """
+    tracking_mode = 'dict'
+    save_changed_fields_only = False
+    track_fields = None
+    untrack_fields = ()
+    change_log = None
 
     def __init__(self, *args, **kwargs):
-        super(ChangedModelMixin, self).__init__(*args, **kwargs)
-        self.__initial = self.to_dict
+        attnames = _get_tracked_fields(type(self)).row_attnames
+        if attnames is not None and not kwargs and len(args) == len(attnames):
+            self._init_row(attnames, args)
+        else:
+            super(ChangedModelMixin, self).__init__(*args, **kwargs)
+        self.__initial = self._get_state()
+
+    def _init_row(self, attnames, values):
+        """
+        Does what `Model.__init__` does with the values of all the concrete
+        fields, e.g. rows loaded by `Model.from_db`, without going through
+        the `__setattr__` of the 'lazy' mode for each of them.
+        """
+        cls = self.__class__
+        pre_init.send(sender=cls, args=values, kwargs={})
+        self.__dict__['_state'] = ModelState()
+        self.__dict__.update(zip(attnames, values))
+        post_init.send(sender=cls, instance=self)
+
+    def _get_state(self):
+        with measure(self, 'snapshot'):
+            return self._take_state()
+
+    def _take_state(self):
+        if self.tracking_mode == 'snapshot':
+            return _get_tracked_fields(type(self)).get_values(self)
+        elif self.tracking_mode == 'lazy':
+            return {}
+        elif self.tracking_mode == 'dict':
+            return self._get_tracked_dict()
+        raise ValueError(
+            'Unknown tracking mode {}.'.format(self.tracking_mode))
 
     @property
     def diff(self):
@@ -46,11 +330,55 @@ class ChangedModelMixin(object):
                 'url': (None, "http://trackmaven.com")
             }
         """
+        with measure(self, 'diff'):
+            return self._get_diff()
+
+    def _get_diff(self):
+        tracked = _get_tracked_fields(type(self))
+        diffs = self._get_tracked_diff(tracked)
+        if tracked.deferred_attnames:
+            diffs.update(self._get_deferred_diff(tracked))
+        return diffs
+
+    def _get_tracked_diff(self, tracked):
+        has_changed = tracked.has_changed
+        if self.tracking_mode == 'snapshot':
+            return dict(
+                (name, (old, new)) for name, old, new in zip(
+                    tracked.names, self.__initial, tracked.get_values(self))
+                if has_changed(old, new))
+        elif self.tracking_mode == 'lazy':
+            names = tracked.attnames
+            diffs = {}
+            for attname, old in self.__initial.items():
+                new = getattr(self, attname)
+                if has_changed(old, new):
+                    diffs[names[attname]] = (old, new)
+            return diffs
         d1 = self.__initial
-        d2 = self.to_dict
-        diffs = [(k, (v, d2[k])) for k, v in d1.items() if force_text(v) != force_text(d2[k])]
+        d2 = self._get_tracked_dict()
+        diffs = [
+            (k, (v, d2[k])) for k, v in d1.items() if has_changed(v, d2[k])]
         return dict(diffs)
 
+    def _get_deferred_diff(self, tracked):
+        """
+        Compares the deferred fields that were loaded or assigned since the
+        initial state was taken. Fields assigned before being loaded have no
+        known original value and are reported with `DEFERRED`.
+        """
+        originals = self.__dict__.get('_ChangedModelMixin__deferred', {})
+        has_changed = tracked.has_changed
+        diffs = {}
+        for attname, name in tracked.deferred_attnames.items():
+            if attname not in self.__dict__:
+                continue
+            old = originals.get(attname, DEFERRED)
+            new = self.__dict__[attname]
+            if old is DEFERRED or has_changed(old, new):
+                diffs[name] = (old, new)
+        return diffs
+
     @property
     def has_changed(self):
         """
@@ -87,9 +415,142 @@ class ChangedModelMixin(object):
     def save(self, *args, **kwargs):
         """
         Saves model and set initial state.
+
+        If `save_changed_fields_only` is set and neither positional arguments,
+        `force_insert` nor `update_fields` are given, an existing row is saved
+        with the changed fields as `update_fields`, along with the loaded
+        untracked fields, whose changes aren't known, and the `auto_now`
+        fields since `save` sets them. Nothing is written if no field changed
+        and no untracked field is loaded.
+        """
+        with measure(self, 'save', kwargs.get('using')):
+            diff = None
+            if self._has_change_hooks():
+                diff = self.diff
+            if (self.save_changed_fields_only and not self._state.adding and
+                    not args and not kwargs.get('force_insert') and
+                    kwargs.get('update_fields') is None):
+                changed_fields = (
+                    self.changed_fields if diff is None else list(diff))
+                untracked_fields = self._get_untracked_fields()
+                if not changed_fields and not untracked_fields:
+                    return
+                if self._meta.pk.name not in changed_fields:
+                    written = changed_fields + untracked_fields
+                    auto_now_names = type(self)._model_fields.auto_now_names
+                    kwargs['update_fields'] = written + [
+                        name for name in auto_now_names
+                        if name not in written]
+            super(ChangedModelMixin, self).save(*args, **kwargs)
+            if diff:
+                self._changes_saved(diff, kwargs.get('update_fields'))
+            self.reset_changes(kwargs.get('update_fields'))
+
+    def _get_untracked_fields(self):
+        """
+        Returns the names of the loaded fields that aren't tracked.
+        """
+        return [
+            name for name, attname in
+            _get_tracked_fields(type(self)).untracked_attnames
+            if attname in self.__dict__]
+
+    def _has_change_hooks(self):
+        return self.change_log is not None or has_callbacks(type(self))
+
+    def _changes_saved(self, diff, update_fields=None):
+        """
+        Records `diff`, or its fields in `update_fields`, in the change log
+        and queues the change callbacks, see the `changelog` and
+        `invalidation` modules.
+        """
+        if update_fields is not None:
+            update_fields = set(update_fields)
+            attnames = dict(
+                (field.name, field.attname) for field in self._meta.fields)
+            diff = dict(
+                (name, values) for name, values in diff.items()
+                if name in update_fields or
+                attnames.get(name) in update_fields)
+        if self.change_log is not None:
+            record_changes(self, diff)
+        changes_saved(self, diff)
+
+    def asave(self, *args, **kwargs):
+        """
+        Async version of `save`, run in the pool of `executor.get_executor`.
+        Requires Python 3.
         """
-        super(ChangedModelMixin, self).save(*args, **kwargs)
-        self.__initial = self.to_dict
+        return run_in_executor(self.save, *args, **kwargs)
+
+    def get_written_fields(self, update_fields=None):
+        """
+        Only the changed fields of existing rows need validating, see
+        `BaseModel.get_written_fields`.
+        """
+        if update_fields is None and not self._state.adding:
+            return self.changed_fields
+        return super(ChangedModelMixin, self).get_written_fields(
+            update_fields)
+
+    def reset_changes(self, fields=None):
+        """
+        Records the current field values as the initial state, e.g. after
+        the model was written to the database without calling `save`.
+        If `fields` is given, only the state of those fields is reset.
+        """
+        tracked = _get_tracked_fields(type(self))
+        if tracked.deferred_attnames:
+            self._reset_deferred(tracked, fields)
+        if fields is None:
+            self.__initial = self._get_state()
+            return
+        names = set(tracked.attnames.get(name, name) for name in fields)
+        if self.tracking_mode == 'snapshot':
+            self.__initial = tuple(
+                new if name in names else old
+                for name, old, new in zip(
+                    tracked.names, self.__initial, tracked.get_values(self)))
+        elif self.tracking_mode == 'lazy':
+            for attname, name in tracked.attnames.items():
+                if name in names:
+                    self.__initial.pop(attname, None)
+        else:
+            current = self._get_tracked_dict()
+            for name in names:
+                if name in current:
+                    self.__initial[name] = current[name]
+
+    def _reset_deferred(self, tracked, fields=None):
+        """
+        Records the current values of the loaded deferred fields, or only of
+        those in `fields`, as their original values.
+        """
+        originals = self.__dict__.setdefault(
+            '_ChangedModelMixin__deferred', {})
+        for attname, name in tracked.deferred_attnames.items():
+            if attname in self.__dict__ and (
+                    fields is None or name in fields or attname in fields):
+                originals[attname] = self.__dict__[attname]
+
+    def refresh_from_db(self, using=None, fields=None, **kwargs):
+        """
+        Reloads field values from the database, recording the original value
+        of the deferred fields loaded for the first time, e.g. on access.
+        """
+        super(ChangedModelMixin, self).refresh_from_db(
+            using=using, fields=fields, **kwargs)
+        tracked = _get_tracked_fields(type(self))
+        if fields is not None and tracked.deferred_attnames:
+            originals = self.__dict__.get('_ChangedModelMixin__deferred', {})
+            self._reset_deferred(tracked, [
+                name for name in fields if name not in originals and
+                tracked.attnames.get(name, name) not in originals])
+
+    def _get_tracked_dict(self):
+        return dict(
+            (field.name, field.value_from_object(self))
+            for field in _get_tracked_fields(type(self)).tracked_dict_fields)
 
     @property
     def to_dict(self):
@@ -103,8 +564,75 @@ class ChangedModelMixin(object):
             {"url": "http://trackmaven.com", "title": "Hello"}
 
         """
-        return model_to_dict(
-            self, fields=[field.name for field in self._meta.fields])
+        return dict(
+            (field.name, field.value_from_object(self))
+            for field in _get_tracked_fields(type(self)).dict_fields)
+
+
+class ValidationStats(object):
+    """
+    Counters of the validation `BaseModel.save` did or skipped for models
+    with `validate_written_fields_only` set.
+
+    Example:
+
+        >>> from trackmaven_django.models import validation_stats
+        >>> post.title = "Hello"
+        >>> post.save()
+        >>> validation_stats.saved_queries
+        1
+
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        #: Number of times a model was validated.
+        self.validations = 0
+        #: Number of fields that weren't cleaned since they weren't written.
+        self.skipped_fields = 0
+        #: Number of unique checks, i.e. queries, that weren't run.
+        self.saved_queries = 0
+
+
+validation_stats = ValidationStats()
+
+_unique_check_counts = {}
+
+
+def _count_unique_checks(instance, exclude=None):
+    """
+    Counts the unique checks that query the database when an existing row
+    is validated, i.e. all but the primary key's.
+    """
+    model = type(instance)
+    if exclude is None:
+        if model not in _unique_check_counts:
+            _unique_check_counts[model] = _count_unique_checks(instance, [])
+        return _unique_check_counts[model]
+    unique_checks, date_checks = instance._get_unique_checks(
+        exclude=list(exclude) + [model._meta.pk.name])
+    return len(unique_checks) + len(date_checks)
+
+
+def _get_unique_exclude(instance, exclude):
+    """
+    Returns `exclude` without the fields of the unique constraints that have
+    a field outside of it, since `Model._get_unique_checks` skips a
+    constraint, e.g. of `unique_together`, if any of its fields is excluded.
+    """
+    unique_checks, date_checks = instance._get_unique_checks()
+    constraints = chain(
+        (names for model_class, names in unique_checks),
+        ((name, unique_for)
+         for model_class, lookup_type, name, unique_for in date_checks))
+    excluded = set(exclude)
+    kept = set()
+    for names in constraints:
+        if not excluded.issuperset(names):
+            kept.update(names)
+    return [name for name in exclude if name not in kept]
 
 
 class BaseModel(models.Model):
@@ -121,7 +649,17 @@ class BaseModel(models.Model):
                 text = models.TextField()
                 ...
 
+    Setting `validate_written_fields_only` limits the validation done by
+    `save` to the fields that are written, see `clean_written_fields`.
+
+    Setting `lookup_cache_timeout` makes `query.get_object_or_make` read
+    through the `lookup_cache_alias` cache, see `get_lookup_cache_version`.
+
     """
+    validate_written_fields_only = False
+    lookup_cache_timeout = None
+    lookup_cache_alias = 'default'
+
     class Meta:
         abstract = True
 
@@ -131,8 +669,252 @@ class BaseModel(models.Model):
         errors that might occur from forcing a field to something that doesn't
         follow the DB schema e.g. a string too long for a field.
         """
-        self.full_clean()
-        super(BaseModel, self).save(*args, **kwargs)
+        using = kwargs.get('using')
+        with measure(self, 'save', using):
+            with measure(self, 'validate', using):
+                if self.validate_written_fields_only:
+                    self.clean_written_fields(kwargs.get('update_fields'))
+                else:
+                    self.full_clean()
+            super(BaseModel, self).save(*args, **kwargs)
+
+    def asave(self, *args, **kwargs):
+        """
+        Async version of `save`, run in the pool of `executor.get_executor`.
+        Requires Python 3.
+
+        Example:
+
+            >>> await post.asave()
+
+        """
+        return run_in_executor(self.save, *args, **kwargs)
+
+    def get_written_fields(self, update_fields=None):
+        """
+        Returns the names of the fields `save` is going to write, or `None`
+        if all fields are written.
+        """
+        return update_fields
+
+    def get_validation_exclude(self, update_fields=None):
+        """
+        Returns the names of the fields `save` doesn't validate, or `None` if
+        all fields are validated.
+        """
+        if not self.validate_written_fields_only:
+            return None
+        return self._get_unwritten_fields(update_fields)
+
+    def _get_unwritten_fields(self, update_fields=None):
+        written_fields = self.get_written_fields(update_fields)
+        if written_fields is None:
+            return None
+        written_fields = set(written_fields)
+        tracked = _get_tracked_fields(type(self))
+        return [
+            name for name, attname in tracked.field_attnames
+            if name not in written_fields and attname not in written_fields]
+
+    def clean_written_fields(self, update_fields=None):
+        """
+        Like `full_clean`, but only cleans the fields returned by
+        `get_written_fields` and skips the unique checks of constraints none
+        of whose fields are written. `clean` is always called.
+        """
+        validation_stats.validations += 1
+        exclude = self._get_unwritten_fields(update_fields)
+        if exclude is None:
+            return self.full_clean()
+        unique_exclude = _get_unique_exclude(self, exclude)
+        validation_stats.skipped_fields += len(exclude)
+        validation_stats.saved_queries += (
+            _count_unique_checks(self) -
+            _count_unique_checks(self, unique_exclude))
+        errors = {}
+        try:
+            self.full_clean(exclude=exclude, validate_unique=False)
+        except ValidationError as e:
+            errors = e.update_error_dict(errors)
+        # Like full_clean, fields with errors aren't checked for uniqueness
+        unique_exclude.extend(
+            name for name in errors
+            if name != NON_FIELD_ERRORS and name not in unique_exclude)
+        try:
+            self.validate_unique(exclude=unique_exclude)
+        except ValidationError as e:
+            errors = e.update_error_dict(errors)
+        if errors:
+            raise ValidationError(errors)
+
+
+#: Statistics of a chunk of `ChangedModelQuerySet.apply_changes`.
+ChunkStats = namedtuple(
+    'ChunkStats', ['loaded', 'changed', 'saved', 'last_pk'])
+
+
+class ChangedModelQuerySet(models.QuerySet):
+    """
+    QuerySet with batch write support for `ChangedModelMixin` models.
+    """
+
+    def bulk_save(self, objs, batch_size=None, validate=True):
+        """
+        Saves the changed fields of many existing instances.
+
+        Instances are grouped by the set of fields that changed, along with
+        their loaded untracked fields, and each group is written with one
+        UPDATE per batch. If `validate` is set, the changed
+        fields of every instance are validated with `validation.validate_many`
+        before anything is written, and invalid instances raise one
+        `ValidationError` with the messages of all of them, by field, without
+        saving the others.
+        Like `QuerySet.update`, `save` isn't called and no signals are sent,
+        but like in `save` the changes are recorded in the change log, the
+        change callbacks are queued, and the cached lookups and identity maps
+        of `query` forget the saved instances.
+
+        Example:
+
+            >>> posts = list(Post.objects.filter(brand=brand))
+            >>> for post in posts:
+            ...     post.score = compute_score(post)
+            >>> Post.objects.bulk_save(posts)
+            42
+
+
+        Returns:
+
+            int: The number of instances that were saved.
+
+        """
+        groups = {}
+        diffs = []
+        for obj in objs:
+            if obj._state.adding or obj.pk is None:
+                raise ValueError(
+                    'bulk_save() can only be used with saved instances.')
+            if obj._has_change_hooks():
+                diff = obj.diff
+                if diff:
+                    diffs.append((obj, diff))
+                changed_fields = list(diff)
+            else:
+                changed_fields = obj.changed_fields
+            if self.model._meta.pk.name in changed_fields:
+                raise ValueError(
+                    'bulk_save() cannot change primary keys.')
+            # Untracked fields may have changed as well
+            fields = changed_fields + obj._get_untracked_fields()
+            if fields:
+                groups.setdefault(tuple(sorted(fields)), []).append(obj)
+
+        if validate:
+            # Imported here since validation imports this module
+            from .validation import validate_many
+
+            names = _get_tracked_fields(self.model).field_names
+            errors = {}
+            with measure(self.model, 'validate', self.db):
+                for fields, group in groups.items():
+                    exclude = [name for name in names if name not in fields]
+                    for message_dict in validate_many(group, exclude=exclude):
+                        for name, messages in message_dict.items():
+                            errors.setdefault(name, []).extend(messages)
+            if errors:
+                raise ValidationError(errors)
+
+        with measure(self.model, 'bulk_save', self.db):
+            with transaction.atomic(using=self.db, savepoint=False):
+                for fields, group in groups.items():
+                    self._bulk_update(group, fields, batch_size)
+                # In the transaction, so that they are handled in one batch
+                for obj, diff in diffs:
+                    obj._changes_saved(diff)
+                if groups:
+                    expire_lookup_cache(self.model, self.db)
+
+        # Imported here since query imports this module
+        from .query import _invalidate_identity_maps
+
+        saved = 0
+        for fields, group in groups.items():
+            for obj in group:
+                obj.reset_changes(fields)
+                _invalidate_identity_maps(self.model, obj)
+            saved += len(group)
+        return saved
+
+    def apply_changes(self, func, chunk_size=1000, batch_size=None,
+                      validate=True):
+        """
+        Calls `func` with every instance of the queryset and saves the ones it
+        changed with `bulk_save`, one chunk of `chunk_size` instances at a
+        time, so that only one chunk is held in memory.
+
+        Chunks are loaded in primary key order, each with a query starting
+        after the last primary key of the previous chunk, so rows aren't
+        skipped or loaded twice when the changes move them in the ordering
+        and the queries stay cheap deep into large tables. Chunks are saved as
+        they are processed: if `bulk_save` raises, e.g. `ValidationError`, the
+        previous chunks stay saved.
+
+        Example:
+
+            >>> for stats in Post.objects.filter(brand=brand).apply_changes(
+            ...         lambda post: post.update_from(feed[post.url])):
+            ...     logger.info("Saved %d of %d posts", stats.saved,
+            ...                 stats.loaded)
+
+
+        Returns:
+
+            An iterator of the `ChunkStats` of each chunk, which must be
+            consumed for the chunks to be processed.
+
+        """
+        queryset = self.order_by('pk')
+        untracked = _get_tracked_fields(self.model).untracked_attnames
+        chunk = list(queryset[:chunk_size])
+        while chunk:
+            for obj in chunk:
+                func(obj)
+            changed = [obj for obj in chunk if obj.has_changed]
+            # Instances with untracked fields are saved even without changes
+            saved = self.bulk_save(
+                chunk if untracked else changed, batch_size=batch_size,
+                validate=validate)
+            last_pk = chunk[-1].pk
+            yield ChunkStats(len(chunk), len(changed), saved, last_pk)
+            if len(chunk) < chunk_size:
+                break
+            chunk = list(queryset.filter(pk__gt=last_pk)[:chunk_size])
+
+    def _bulk_update(self, objs, fields, batch_size=None):
+        if hasattr(models.QuerySet, 'bulk_update'):
+            return self.bulk_update(objs, fields, batch_size=batch_size)
+        # Same CASE WHEN update Django's own bulk_update does
+        fields = [self.model._meta.get_field(name) for name in fields]
+        connection = connections[self.db]
+        size = connection.ops.bulk_batch_size(['pk', 'pk'] + fields, objs)
+        size = min(batch_size, size) if batch_size else size
+        for start in range(0, len(objs), max(size, 1)):
+            batch = objs[start:start + size]
+            updates = {}
+            for field in fields:
+                whens = [
+                    When(pk=obj.pk, then=Value(
+                        getattr(obj, field.attname), output_field=field))
+                    for obj in batch]
+                updates[field.name] = Case(*whens, output_field=field)
+            self.filter(pk__in=[obj.pk for obj in batch]).update(**updates)
+
+
+class ChangedModelManager(
+        models.Manager.from_queryset(ChangedModelQuerySet)):
+    """
+    Default manager of `ChangedModel`, see `ChangedModelQuerySet`.
+    """
 
 
 class ChangedModel(ChangedModelMixin, BaseModel):
@@ -151,5 +933,66 @@ class ChangedModel(ChangedModelMixin, BaseModel):
                 ...
 
     """
+    objects = ChangedModelManager()
+
     class Meta:
         abstract = True
+
+
+def _lookup_cache_version_key(model):
+    return 'trackmaven_django:lookup:{}'.format(
+        model._meta.concrete_model._meta.label_lower)
+
+
+def get_lookup_cache_version(model):
+    """
+    Returns the version of the cached lookups of a `BaseModel` with
+    `lookup_cache_timeout` set. Saving or deleting an instance of the model,
+    or saving instances with `ChangedModelQuerySet.bulk_save`, moves to a new
+    version, see `expire_lookup_cache`. Changes made without signals, e.g.
+    with `QuerySet.update` or raw SQL, aren't seen until
+    `expire_lookup_cache` is called or the cached lookups time out. Lookups
+    made in a transaction don't use the cache.
+    """
+    cache = caches[model.lookup_cache_alias]
+    key = _lookup_cache_version_key(model)
+    version = cache.get(key)
+    if version is None:
+        # Start from the time rather than 1, so entries of an evicted version
+        # aren't used again
+        cache.add(key, int(time.time() * 1000), None)
+        version = cache.get(key)
+    return version
+
+
+def expire_lookup_cache(model, using=None):
+    """
+    Moves the cached lookups of `model` to a new version, e.g. after
+    updating it with `QuerySet.update`.
+
+    Inside a transaction the version is moved again once it commits, since
+    the lookups of other connections may have cached the rows it changed as
+    they were before the commit.
+    """
+    if (not issubclass(model, BaseModel) or
+            model.lookup_cache_timeout is None):
+        return
+    _incr_lookup_cache_version(model)
+    if connections[using or DEFAULT_DB_ALIAS].in_atomic_block:
+        transaction.on_commit(
+            lambda: _incr_lookup_cache_version(model), using)
+
+
+def _incr_lookup_cache_version(model):
+    cache = caches[model.lookup_cache_alias]
+    key = _lookup_cache_version_key(model)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, int(time.time() * 1000), None)
+
+
+@receiver(post_save)
+@receiver(post_delete)
+def _expire_lookup_cache(sender, using=None, **kwargs):
+    expire_lookup_cache(sender, using)
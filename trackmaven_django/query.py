@@ -1,4 +1,28 @@
+import hashlib
+import operator
+import threading
+from contextlib import contextmanager
+from functools import reduce
+
+from django.core.cache import caches
+from django.db import IntegrityError, connections, transaction
+from django.db.models import AutoField, Manager, Model, Q
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
 from django.shortcuts import _get_queryset
+from django.utils.encoding import force_bytes
+
+from .executor import chain, run_in_executor
+from .instrumentation import measure
+from .models import BaseModel, ChangedModelMixin, get_lookup_cache_version
+
+_local = threading.local()
+_NOT_CACHED = object()
+_CACHED_MISS = 'trackmaven_django:miss'
+
+# Maximum number of values of an INSERT batch on PostgreSQL, where psycopg2
+# interpolates them into the SQL, to bound the size of the statement
+MAX_QUERY_PARAMS = 65535
 
 
 def get_object_or_make(klass, *args, **kwargs):
@@ -22,9 +46,574 @@ def get_object_or_make(klass, *args, **kwargs):
         object: The django model passed in
         exists (boolean): An boolean specifying whether an object was found.
 
+    Inside an `identity_map` block, repeated lookups are answered from the
+    map instead of the database. Lookups of a `BaseModel` with
+    `lookup_cache_timeout` set also read through its lookup cache, outside
+    of transactions, whose rows other processes can't see yet.
+
+    """
+    queryset = _get_queryset(klass)
+    model = queryset.model
+    cache = _get_identity_map()
+    key = None if cache is None else cache.make_key(klass, args, kwargs)
+    if key is not None:
+        instance = cache.get(model, key)
+        if instance is None:
+            return model(*args, **kwargs), False
+        elif instance is not _NOT_CACHED:
+            return instance, True
+    with measure(model, 'lookup', queryset.db):
+        cache_key = _make_lookup_cache_key(
+            model, klass, args, kwargs, queryset.db)
+        instance = _get_lookup_cache(cache_key)
+        if instance is _NOT_CACHED:
+            try:
+                instance = queryset.get(*args, **kwargs)
+            except model.DoesNotExist:
+                instance = None
+            _set_lookup_cache(model, cache_key, instance)
+    if key is not None:
+        cache.add(model, key, instance)
+    if instance is None:
+        return model(*args, **kwargs), False
+    return instance, True
+
+
+def get_object_or_make_many(klass, lookups, batch_size=None):
+    """
+    Batch version of `get_object_or_make`.
+
+    Looks up every dictionary in `lookups` with one query per group of
+    lookups sharing the same keys (split into batches the database can
+    handle), and populates a new, unsaved instance for each lookup that
+    wasn't found. Identical lookups resolve to the same instance.
+
+    Only exact lookups on concrete fields are supported (e.g. `url` or
+    `author_id`, but not `url__iexact`), since the rows found have to be
+    matched back to the lookups they came from.
+
+    Example:
+
+        >>> results = get_object_or_make_many(Post, [
+        ...     {"url": "http://trackmaven.com"},
+        ...     {"url": "http://trackmaven.com/blog"},
+        ... ])
+        >>> [(instance.pk, exists) for instance, exists in results]
+        [(1, True), (None, False)]
+
+
+    Returns:
+
+        list: A `(object, exists)` tuple for each lookup, in input order.
+
     """
     queryset = _get_queryset(klass)
+    model = queryset.model
+    cache = _get_identity_map()
+    if cache is None:
+        return _get_objects_or_make(queryset, lookups, batch_size)
+
+    keys = [cache.make_key(klass, (), lookup) for lookup in lookups]
+    cached = [
+        _NOT_CACHED if key is None else cache.get(model, key) for key in keys]
+    missing = [
+        lookup for lookup, instance in zip(lookups, cached)
+        if instance is _NOT_CACHED]
+    fetched = iter(_get_objects_or_make(queryset, missing, batch_size))
+    results = []
+    made = {}
+    for lookup, key, instance in zip(lookups, keys, cached):
+        if instance is _NOT_CACHED:
+            instance, exists = next(fetched)
+            if key is not None:
+                cache.add(model, key, instance if exists else None)
+                if not exists:
+                    made[key] = instance
+            results.append((instance, exists))
+        elif instance is None:
+            if key not in made:
+                made[key] = model(**lookup)
+            results.append((made[key], False))
+        else:
+            results.append((instance, True))
+    return results
+
+
+def get_object_or_make_or_create(klass, defaults=None, **kwargs):
+    """
+    Race-safe sibling of `get_object_or_make` that also saves the object
+    when none is found, see `get_object_or_make_or_create_many`.
+
+    Example:
+
+        >>> instance, created = get_object_or_make_or_create(
+        ...     Post, url="http://trackmaven.com", defaults={"title": "Hi"})
+        >>> instance.pk
+        1
+        >>> created
+        True
+
+
+    Returns:
+
+        object: The django model passed in
+        created (boolean): A boolean specifying whether the object was
+        inserted.
+
+    """
+    return get_object_or_make_or_create_many(
+        klass, [kwargs], [defaults or {}])[0]
+
+
+def get_object_or_make_or_create_many(klass, lookups, defaults=None):
+    """
+    Batch version of `get_object_or_make_or_create`.
+
+    Looks up the existing objects with `get_object_or_make_many` and inserts
+    the missing ones, populated with the lookup fields and the matching
+    `defaults` dictionary, while ignoring rows that were inserted by someone
+    else in the meantime, which are fetched and reported as found instead.
+    The fields of each lookup must be unique together.
+
+    On PostgreSQL the missing objects are inserted with one
+    ``INSERT ... ON CONFLICT (...) DO NOTHING RETURNING`` per batch, on
+    SQLite 3.24 and later with ``INSERT ... ON CONFLICT (...) DO NOTHING``
+    per object, and on other databases, e.g. MySQL, with a savepoint per
+    object. Only conflicts on the lookup fields are ignored: an
+    `IntegrityError` of another constraint is raised. `BaseModel` instances
+    are validated without their unique checks before being inserted.
+    `pre_save` and `post_save` are sent for the inserted objects.
+
+
+    Returns:
+
+        list: A `(object, created)` tuple for each lookup, in input order.
+
+    """
+    queryset = _get_queryset(klass)
+    model = queryset.model
+    if defaults is None:
+        defaults = [{}] * len(lookups)
+    elif len(defaults) != len(lookups):
+        raise ValueError(
+            'get_object_or_make_or_create_many() got {} lookups but {} '
+            'defaults.'.format(len(lookups), len(defaults)))
+    results = get_object_or_make_many(queryset, lookups)
+
+    groups = {}
+    seen = set()
+    for lookup, values, (instance, exists) in zip(lookups, defaults, results):
+        if exists:
+            continue
+        for name, value in values.items():
+            setattr(instance, name, value)
+        if id(instance) not in seen:
+            seen.add(id(instance))
+            groups.setdefault(tuple(sorted(lookup)), []).append(instance)
+
+    inserted = set()
+    replaced = {}
+    for names, objs in groups.items():
+        for obj in objs:
+            if isinstance(obj, BaseModel):
+                obj.full_clean(validate_unique=False)
+        for obj, created in zip(objs, _insert_ignoring_conflicts(
+                queryset, objs, names)):
+            if created:
+                inserted.add(id(obj))
+        conflicted = [obj for obj in objs if id(obj) not in inserted]
+        for obj, (instance, exists) in zip(conflicted, _get_objects_or_make(
+                queryset, [dict((name, getattr(obj, _get_field(
+                    model, name).attname)) for name in names)
+                    for obj in conflicted])):
+            if not exists:
+                # Not ignored because of a row with the same lookup
+                raise IntegrityError(
+                    'Could not insert {!r}, no row conflicts with it on '
+                    '{}.'.format(obj, ', '.join(names)))
+            replaced[id(obj)] = instance
+
+    return [
+        (replaced.get(id(instance), instance), id(instance) in inserted)
+        for instance, exists in results]
+
+
+def _insert_ignoring_conflicts(queryset, objs, conflict_names):
+    """
+    Inserts `objs`, skipping the ones conflicting with an existing row on
+    `conflict_names`, and returns whether each one was inserted.
+    """
+    model = queryset.model
+    opts = model._meta
+    connection = connections[queryset.db]
+    if opts.parents or not (
+            connection.vendor == 'postgresql' or
+            connection.vendor == 'sqlite' and
+            connection.Database.sqlite_version_info >= (3, 24, 0)):
+        # MySQL has no conflict target, INSERT IGNORE and ON DUPLICATE KEY
+        # UPDATE would also ignore the other constraints
+        return [
+            _save_ignoring_conflict(queryset, obj, conflict_names)
+            for obj in objs]
+
+    for obj in objs:
+        pre_save.send(sender=model, instance=obj, raw=False,
+                      using=queryset.db, update_fields=None)
+    fields = [
+        field for field in opts.concrete_fields
+        if not isinstance(field, AutoField) or
+        all(getattr(obj, field.attname) is not None for obj in objs)]
+    columns = ', '.join(
+        connection.ops.quote_name(field.column) for field in fields)
+    table = connection.ops.quote_name(opts.db_table)
+    rows = [
+        [field.get_db_prep_save(field.pre_save(obj, True), connection)
+         for field in fields]
+        for obj in objs]
+    placeholders = '({})'.format(', '.join(['%s'] * len(fields)))
+    conflict_fields = [_get_field(model, name) for name in conflict_names]
+    conflict_columns = ', '.join(
+        connection.ops.quote_name(field.column) for field in conflict_fields)
+
+    with transaction.atomic(using=queryset.db, savepoint=False):
+        cursor = connection.cursor()
+        if connection.vendor == 'postgresql':
+            # bulk_batch_size doesn't limit PostgreSQL, bound the size of the
+            # statement instead
+            size = min(
+                connection.ops.bulk_batch_size(fields, objs),
+                MAX_QUERY_PARAMS // max(len(fields), 1))
+            returned = {}
+            for start in range(0, len(rows), max(size, 1)):
+                batch = rows[start:start + size]
+                cursor.execute(
+                    'INSERT INTO {} ({}) VALUES {} ON CONFLICT ({}) DO '
+                    'NOTHING RETURNING {}, {}'.format(
+                        table, columns, ', '.join([placeholders] * len(batch)),
+                        conflict_columns,
+                        connection.ops.quote_name(opts.pk.column),
+                        conflict_columns),
+                    [param for row in batch for param in row])
+                returned.update(
+                    (tuple(_prep_value(model, field.name, value)
+                           for field, value in zip(conflict_fields, row[1:])),
+                     row[0])
+                    for row in cursor.fetchall())
+            pks = [
+                returned.get(tuple(
+                    _prep_value(model, field.name, getattr(obj, field.attname))
+                    for field in conflict_fields))
+                for obj in objs]
+        else:
+            statement = (
+                'INSERT INTO {} ({}) VALUES {} ON CONFLICT ({}) DO '
+                'NOTHING'.format(
+                    table, columns, placeholders, conflict_columns))
+            pks = []
+            for obj, row in zip(objs, rows):
+                cursor.execute(statement, row)
+                if not cursor.rowcount:
+                    pks.append(None)
+                elif obj.pk is not None:
+                    pks.append(obj.pk)
+                else:
+                    pks.append(connection.ops.last_insert_id(
+                        cursor, opts.db_table, opts.pk.column))
+
+    created = []
+    for obj, pk in zip(objs, pks):
+        created.append(pk is not None)
+        if pk is None:
+            continue
+        obj.pk = pk
+        obj._state.adding = False
+        obj._state.db = queryset.db
+        if isinstance(obj, ChangedModelMixin):
+            obj.reset_changes()
+        post_save.send(sender=model, instance=obj, created=True, raw=False,
+                       using=queryset.db, update_fields=None)
+    return created
+
+
+def _save_ignoring_conflict(queryset, obj, conflict_names):
     try:
-        return queryset.get(*args, **kwargs), True
-    except queryset.model.DoesNotExist:
-        return klass(*args, **kwargs), False
+        with transaction.atomic(using=queryset.db):
+            Model.save_base(obj, force_insert=True, using=queryset.db)
+    except IntegrityError:
+        lookup = dict(
+            (name, getattr(obj, _get_field(queryset.model, name).attname))
+            for name in conflict_names)
+        if not queryset.filter(**lookup).exists():
+            raise
+        return False
+    if isinstance(obj, ChangedModelMixin):
+        obj.reset_changes()
+    return True
+
+
+def aget_object_or_make(klass, *args, **kwargs):
+    """
+    Async version of `get_object_or_make`, run in the pool of
+    `executor.get_executor`. Requires Python 3.
+
+    Example:
+
+        >>> instance, exists = await aget_object_or_make(
+        ...     Post, url="http://trackmaven.com")
+
+    """
+    return run_in_executor(get_object_or_make, klass, *args, **kwargs)
+
+
+def aget_object_or_make_many(klass, lookups, batch_size=500):
+    """
+    Async version of `get_object_or_make_many`. The lookups are split into
+    batches of `batch_size`, which are looked up concurrently in the pool of
+    `executor.get_executor`. Requires Python 3.
+
+    Example:
+
+        >>> results = await aget_object_or_make_many(Post, [
+        ...     {"url": "http://trackmaven.com"},
+        ...     {"url": "http://trackmaven.com/blog"},
+        ... ])
+
+    """
+    import asyncio
+    batches = [
+        lookups[start:start + batch_size]
+        for start in range(0, len(lookups), batch_size)]
+    return chain(
+        asyncio.gather(*[
+            run_in_executor(get_object_or_make_many, klass, batch)
+            for batch in batches]),
+        lambda results: [result for batch in results for result in batch])
+
+
+def _get_objects_or_make(queryset, lookups, batch_size=None):
+    with measure(queryset.model, 'lookup', queryset.db):
+        return _fetch_objects_or_make(queryset, lookups, batch_size)
+
+
+def _fetch_objects_or_make(queryset, lookups, batch_size=None):
+    model = queryset.model
+    connection = connections[queryset.db]
+
+    keys = [_lookup_key(model, lookup) for lookup in lookups]
+    groups = {}
+    for lookup, key in zip(lookups, keys):
+        names = tuple(name for name, _ in key)
+        groups.setdefault(names, {}).setdefault(key, lookup)
+
+    found = {}
+    for names, group in groups.items():
+        attnames = [_get_field(model, name).attname for name in names]
+        unique_lookups = list(group.values())
+        size = batch_size or connection.ops.bulk_batch_size(
+            names, unique_lookups)
+        for start in range(0, len(unique_lookups), max(size, 1)):
+            batch = unique_lookups[start:start + size]
+            if len(names) == 1:
+                # IN (NULL) never matches, None is looked up like `exact`
+                name = names[0]
+                values = [lookup[name] for lookup in batch]
+                condition = Q(**{'%s__in' % name: [
+                    value for value in values if value is not None]})
+                if None in values:
+                    condition |= Q(**{'%s__isnull' % name: True})
+            else:
+                condition = reduce(
+                    operator.or_, [Q(**lookup) for lookup in batch])
+            for instance in queryset.filter(condition):
+                key = tuple(
+                    (name, _prep_value(model, name, getattr(instance, att)))
+                    for name, att in zip(names, attnames))
+                if key not in group:
+                    continue
+                if key in found:
+                    raise model.MultipleObjectsReturned(
+                        "get_object_or_make_many() returned more than one "
+                        "%s for the lookup %r" % (
+                            model._meta.object_name, group[key]))
+                found[key] = instance
+
+    results = []
+    made = {}
+    for lookup, key in zip(lookups, keys):
+        if key in found:
+            results.append((found[key], True))
+        else:
+            if key not in made:
+                made[key] = model(**lookup)
+            results.append((made[key], False))
+    return results
+
+
+def _get_field(model, name):
+    if name == 'pk':
+        return model._meta.pk
+    return model._meta.get_field(name)
+
+
+def _prep_value(model, name, value):
+    """
+    Normalizes a lookup value so that it can be compared against the value
+    of a fetched instance, e.g. a related instance becomes its primary key.
+    """
+    field = _get_field(model, name)
+    if hasattr(value, '_meta') and field.is_relation:
+        value = getattr(value, field.target_field.attname)
+    return field.get_prep_value(field.to_python(value))
+
+
+def _lookup_key(model, lookup):
+    for name in lookup:
+        if '__' in name:
+            raise ValueError(
+                "get_object_or_make_many() only supports exact lookups on "
+                "concrete fields, got '%s'." % name)
+    return tuple(sorted(
+        (name, _prep_value(model, name, value))
+        for name, value in lookup.items()))
+
+
+def _make_lookup_cache_key(model, klass, args, kwargs, using):
+    """
+    Returns the cache alias, key and version of a lookup, or `None` if the
+    lookup isn't cached.
+    """
+    if (args or hasattr(klass, 'query') or
+            getattr(model, 'lookup_cache_timeout', None) is None):
+        return None
+    # Rows and misses seen in a transaction aren't cached, since the version
+    # isn't bumped if it's rolled back
+    if connections[using].in_atomic_block:
+        return None
+    lookup = sorted(
+        (name, ('pk', value.pk) if hasattr(value, '_meta') else value)
+        for name, value in kwargs.items())
+    digest = hashlib.md5(force_bytes(repr(lookup))).hexdigest()
+    key = 'trackmaven_django:lookup:{}:{}:{}'.format(
+        model._meta.concrete_model._meta.label_lower,
+        klass.name if isinstance(klass, Manager) else '', digest)
+    return model.lookup_cache_alias, key, get_lookup_cache_version(model)
+
+
+def _get_lookup_cache(cache_key):
+    if cache_key is None:
+        return _NOT_CACHED
+    alias, key, version = cache_key
+    instance = caches[alias].get(key, _NOT_CACHED, version=version)
+    return None if instance == _CACHED_MISS else instance
+
+
+def _set_lookup_cache(model, cache_key, instance):
+    if cache_key is None:
+        return
+    alias, key, version = cache_key
+    caches[alias].set(
+        key, _CACHED_MISS if instance is None else instance,
+        model.lookup_cache_timeout, version=version)
+
+
+class IdentityMap(object):
+    """
+    The results of `get_object_or_make` and `get_object_or_make_many` within
+    an `identity_map` block, keyed by model class or manager and lookup.
+
+    Attributes:
+
+        hits (int): Number of lookups answered from the map.
+        misses (int): Number of lookups that had to query the database.
+
+    """
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self._entries = {}
+
+    def make_key(self, klass, args, kwargs):
+        """
+        Returns the key of a lookup, or `None` if it can't be cached, e.g.
+        lookups on a queryset, with `Q` objects or with unhashable values.
+        """
+        if args or hasattr(klass, 'query'):
+            return None
+        try:
+            key = (klass, frozenset(kwargs.items()))
+            hash(key)
+        except TypeError:
+            return None
+        return key
+
+    def get(self, model, key):
+        """
+        Returns the instance found for the key, `None` if the lookup didn't
+        find anything, or `_NOT_CACHED`.
+        """
+        entries = self._entries.get(model._meta.concrete_model)
+        instance = _NOT_CACHED if entries is None else entries.get(
+            key, _NOT_CACHED)
+        if instance is _NOT_CACHED:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return instance
+
+    def add(self, model, key, instance):
+        self._entries.setdefault(
+            model._meta.concrete_model, {})[key] = instance
+
+    def invalidate(self, instance):
+        """
+        Forgets the lookups that found `instance`, as well as the lookups of
+        its model that didn't find anything.
+        """
+        entries = self._entries.get(instance._meta.concrete_model)
+        if not entries:
+            return
+        for key, cached in list(entries.items()):
+            if cached is None or cached is instance or (
+                    instance.pk is not None and cached.pk == instance.pk):
+                del entries[key]
+
+
+@contextmanager
+def identity_map():
+    """
+    Remembers the results of `get_object_or_make` and
+    `get_object_or_make_many` for the duration of the block, e.g. a request,
+    so repeated lookups don't query the database. Lookups of instances that
+    are saved or deleted in the block, including with
+    `ChangedModelQuerySet.bulk_save`, are forgotten; changes made with
+    `QuerySet.update` or raw SQL aren't seen.
+
+    Example:
+
+        >>> with identity_map() as cache:
+        ...     get_object_or_make(Brand, name="TrackMaven")
+        ...     get_object_or_make(Brand, name="TrackMaven")
+        >>> cache.hits, cache.misses
+        (1, 1)
+
+    """
+    cache = IdentityMap()
+    stack = _local.__dict__.setdefault('identity_maps', [])
+    stack.append(cache)
+    try:
+        yield cache
+    finally:
+        stack.remove(cache)
+
+
+def _get_identity_map():
+    stack = getattr(_local, 'identity_maps', None)
+    return stack[-1] if stack else None
+
+
+@receiver(post_save)
+@receiver(post_delete)
+def _invalidate_identity_maps(sender, instance, **kwargs):
+    for cache in getattr(_local, 'identity_maps', ()):
+        cache.invalidate(instance)
@@ -0,0 +1,172 @@
+"""
+Compact serialization of `BaseModel` and `ChangedModel` instances, e.g. to
+cache them.
+
+Pickling a model instance stores its class, `_state` and the initial state
+of `ChangedModelMixin` next to its field values. Here the values of the
+concrete fields are stored positionally, in the order of the model's fields,
+and the change tracking state is reduced to the original values of the
+changed fields.
+
+Example:
+
+    >>> data = serialize_many(Post.objects.filter(brand=brand))
+    >>> cache.set(key, data)
+    ...
+    >>> posts = deserialize_many(cache.get(key))
+
+Payloads are tied to the fields of the model: deserializing a payload written
+before a field was added or removed raises `ValueError`, which can be handled
+like a cache miss.
+"""
+import zlib
+
+from django.apps import apps
+from django.db.models.query_utils import deferred_class_factory
+from django.utils.six.moves import cPickle as pickle
+
+from .models import DEFERRED, ChangedModelMixin, _get_tracked_fields
+
+#: Version of the payload format.
+FORMAT_VERSION = 1
+
+# Protocol 2 can be read by Python 2 and 3
+PICKLE_PROTOCOL = 2
+
+
+class _Layout(object):
+    """
+    The positions of the concrete fields of a model in a payload, taken from
+    the field metadata built when the model is prepared.
+    """
+
+    def __init__(self, model):
+        fields = _get_tracked_fields(model)
+        self.model = model
+        self.label = model._meta.label
+        self.attnames = fields.concrete_attnames
+        self.get_values = fields.get_concrete_values
+        self.positions = {}
+        for position, (name, attname) in enumerate(
+                fields.concrete_field_attnames):
+            self.positions[name] = self.positions[attname] = position
+        self.fingerprint = zlib.crc32(
+            ','.join(self.attnames).encode('ascii')) & 0xffffffff
+
+
+_layouts = {}
+
+
+def _get_layout(model):
+    try:
+        return _layouts[model]
+    except KeyError:
+        _layouts[model] = layout = _Layout(model)
+        return layout
+
+
+def _encode(layout, instance):
+    state = instance._state
+    changed = ()
+    if isinstance(instance, ChangedModelMixin):
+        positions = layout.positions
+        changed = tuple(
+            (positions[name], old)
+            for name, (old, new) in instance.diff.items())
+    if not getattr(type(instance), '_deferred', False):
+        return (state.db, state.adding, layout.get_values(instance), changed)
+    deferred = instance.get_deferred_fields()
+    data = instance.__dict__
+    values = tuple(
+        getattr(instance, attname) for attname in layout.attnames
+        if attname not in deferred)
+    loaded = dict(
+        (attname, data[attname]) for attname in deferred if attname in data)
+    return (state.db, state.adding, values, changed, tuple(sorted(deferred)),
+            loaded)
+
+
+def _decode(layout, row):
+    db, adding, values, changed = row[:4]
+    deferred, loaded = row[4:] or ((), {})
+    attnames = layout.attnames
+    originals = dict(changed)
+    if deferred:
+        model = deferred_class_factory(layout.model, deferred)
+        names = [attname for attname in attnames if attname not in deferred]
+    else:
+        model = layout.model
+        names = attnames
+    positions = layout.positions
+    # Create the instance from the original values, so that it takes the
+    # same initial state, then assign the current values of changed fields
+    initial = [
+        originals.get(positions[attname], value)
+        for attname, value in zip(names, values)]
+    instance = model.from_db(db, names, initial)
+    instance._state.adding = adding
+    for attname, value in loaded.items():
+        old = originals.get(positions[attname], value)
+        if old is not DEFERRED:
+            instance.__dict__[attname] = old
+            if isinstance(instance, ChangedModelMixin):
+                instance.reset_changes([attname])
+    current = dict(zip(names, values))
+    current.update(loaded)
+    for position in originals:
+        attname = attnames[position]
+        setattr(instance, attname, current[attname])
+    return instance
+
+
+def serialize_many(instances):
+    """
+    Returns the payload of a list of model instances, as bytes.
+    """
+    runs = []
+    model = None
+    for instance in instances:
+        cls = type(instance)
+        if getattr(cls, '_deferred', False):
+            cls = cls._meta.proxy_for_model
+        if cls is not model:
+            model = cls
+            layout = _get_layout(model)
+            rows = []
+            runs.append((layout.label, layout.fingerprint, rows))
+        rows.append(_encode(layout, instance))
+    return pickle.dumps((FORMAT_VERSION, runs), PICKLE_PROTOCOL)
+
+
+def deserialize_many(data):
+    """
+    Returns the list of model instances of a payload returned by
+    `serialize_many`.
+    """
+    version, runs = pickle.loads(data)
+    if version != FORMAT_VERSION:
+        raise ValueError('Unsupported payload version {}.'.format(version))
+    instances = []
+    for label, fingerprint, rows in runs:
+        layout = _get_layout(apps.get_model(label))
+        if layout.fingerprint != fingerprint:
+            raise ValueError(
+                'The fields of {} changed since the payload was '
+                'serialized.'.format(label))
+        instances.extend(_decode(layout, row) for row in rows)
+    return instances
+
+
+def serialize(instance):
+    """
+    Returns the payload of a model instance, as bytes.
+    """
+    return serialize_many([instance])
+
+
+def deserialize(data):
+    """
+    Returns the model instance of a payload returned by `serialize`.
+    """
+    instance, = deserialize_many(data)
+    return instance
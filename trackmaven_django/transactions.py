@@ -0,0 +1,60 @@
+import threading
+
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+
+class TransactionBuffer(object):
+    """
+    Collects items during a transaction and passes them to `flush` in one
+    call once the transaction commits, e.g. to write them with one query.
+
+    Items added in a transaction or savepoint that is rolled back are
+    dropped, like the callbacks of `transaction.on_commit`. Outside of a
+    transaction, items are flushed right away.
+
+    Example:
+
+        >>> buffer = TransactionBuffer(lambda items: Log.objects.bulk_create(
+        ...     [Log(text=item) for item in items]))
+        >>> with transaction.atomic():
+        ...     buffer.add(['first'])
+        ...     buffer.add(['second'])
+
+    """
+
+    def __init__(self, flush):
+        self.flush = flush
+        self._local = threading.local()
+
+    def add(self, items, using=None):
+        """
+        Adds `items`, a list, to be flushed when the transaction of the
+        `using` database commits.
+        """
+        using = using or DEFAULT_DB_ALIAS
+        transaction.on_commit(_Commit(self, using, items), using)
+
+    def _commit(self, using, items):
+        pending = self._local.__dict__.setdefault('pending', {})
+        pending.setdefault(using, []).extend(items)
+        # Commit callbacks are popped from run_on_commit one at a time, so the
+        # items of the transaction are complete when none of ours remain
+        if any(isinstance(func, _Commit) and func.buffer is self
+               for sids, func in connections[using].run_on_commit):
+            return
+        self.flush(pending.pop(using))
+
+
+class _Commit(object):
+    """
+    The `transaction.on_commit` callback of the items of a
+    `TransactionBuffer.add` call.
+    """
+
+    def __init__(self, buffer, using, items):
+        self.buffer = buffer
+        self.using = using
+        self.items = items
+
+    def __call__(self):
+        self.buffer._commit(self.using, self.items)
@@ -0,0 +1,256 @@
+"""
+Validation of many `BaseModel` instances at once, e.g. before a bulk import.
+
+`validate_many` validates each instance like `full_clean`, excluding the
+fields `BaseModel.save` wouldn't validate, but runs the unique checks of all
+the instances together: each unique constraint is checked with one `IN`
+query per batch instead of one query per instance, and instances of the
+batch having the same unique values are reported as well.
+
+Example:
+
+    >>> errors = validate_many(posts)
+    >>> Post.objects.bulk_create(
+    ...     [post for post, error in zip(posts, errors) if not error])
+
+Cleaning the fields of large batches can be spread over a process pool, see
+`validate_many`.
+"""
+import multiprocessing
+import operator
+from functools import reduce
+from itertools import chain
+
+from django.core.exceptions import NON_FIELD_ERRORS, ValidationError
+from django.db import connections, router
+from django.db.models import Q
+
+from .models import _get_unique_exclude
+from .serialization import deserialize_many, serialize_many
+
+
+def validate_many(instances, batch_size=None, processes=None,
+                  chunk_size=500, exclude=None):
+    """
+    Validates `instances` and returns, for each of them, a dictionary of the
+    error messages of each field, like `ValidationError.message_dict`, which
+    is empty if the instance is valid. Like with `full_clean`, the fields in
+    `exclude` aren't validated.
+
+    Values are compared in Python to find the conflicting rows, so checks of
+    text fields follow Python's case sensitivity even if the database's
+    collation doesn't.
+
+    With `processes` set, batches of more than `chunk_size` instances have
+    their fields cleaned by a pool of that many processes, chunk by chunk.
+    Relation fields, whose validation queries the database, `clean` and the
+    unique checks are still run by the calling process. Workers are forked
+    with Django set up and must not use the database connections they
+    inherit, so models with fields or validators querying the database
+    shouldn't be validated in parallel.
+    """
+    instances = list(instances)
+    if processes and processes > 1 and len(instances) > chunk_size:
+        errors = _clean_in_pool(instances, processes, chunk_size, exclude)
+    else:
+        errors = [_clean(instance, exclude=exclude) for instance in instances]
+
+    # Unique checks of the fields without errors, by constraint
+    checks = {}
+    for position, instance in enumerate(instances):
+        # Constraints with a validated field keep all their fields
+        excluded = set(
+            _get_unique_exclude(instance, _get_exclude(instance, exclude)))
+        excluded.update(
+            name for name in errors[position] if name != NON_FIELD_ERRORS)
+        unique_checks, date_checks = instance._get_unique_checks(
+            exclude=list(excluded))
+        for model_class, unique_check in unique_checks:
+            checks.setdefault((model_class, unique_check), []).append(
+                position)
+        if date_checks:
+            _add_errors(
+                errors[position], instance._perform_date_checks(date_checks))
+
+    for (model_class, unique_check), positions in checks.items():
+        conflicts = _find_unique_conflicts(
+            model_class, unique_check,
+            [instances[position] for position in positions], batch_size)
+        key = unique_check[0] if len(unique_check) == 1 else NON_FIELD_ERRORS
+        for index in conflicts:
+            instance = instances[positions[index]]
+            _add_errors(errors[positions[index]], {key: [
+                instance.unique_error_message(model_class, unique_check)]})
+
+    return [
+        ValidationError(error).message_dict if error else {}
+        for error in errors]
+
+
+def _get_exclude(instance, exclude=None):
+    """
+    Returns `exclude` and the fields `BaseModel.save` wouldn't validate.
+    """
+    exclude = list(exclude or ())
+    if hasattr(instance, 'get_validation_exclude'):
+        exclude.extend(instance.get_validation_exclude() or ())
+    return exclude
+
+
+def _clean(instance, errors=None, exclude=None):
+    """
+    Runs the checks of `full_clean` but the unique checks.
+    """
+    errors = {} if errors is None else errors
+    exclude = _get_exclude(instance, exclude)
+    try:
+        instance.clean_fields(exclude=exclude)
+    except ValidationError as e:
+        errors = e.update_error_dict(errors)
+    try:
+        instance.clean()
+    except ValidationError as e:
+        errors = e.update_error_dict(errors)
+    return errors
+
+
+def _get_field_names(instance, relations):
+    """
+    Returns the names of the relation fields, or of the other fields.
+    """
+    return [
+        field.name for field in instance._meta.fields
+        if bool(field.is_relation) is relations]
+
+
+def _init_worker():
+    import django
+    from django.apps import apps
+    if not apps.ready:
+        django.setup()
+
+
+def _clean_chunk(payload):
+    """
+    Cleans the fields but the relations and the excluded fields of the
+    instances of a payload and returns their errors and the attributes
+    changed by the cleaning.
+    """
+    data, excluded = payload
+    results = []
+    for instance in deserialize_many(data):
+        exclude = _get_exclude(
+            instance, _get_field_names(instance, relations=True) + excluded)
+        attnames = [
+            field.attname for field in instance._meta.concrete_fields
+            if field.attname in instance.__dict__]
+        before = [getattr(instance, attname) for attname in attnames]
+        try:
+            instance.clean_fields(exclude=exclude)
+            errors = {}
+        except ValidationError as e:
+            errors = e.message_dict
+        cleaned = {}
+        for attname, old in zip(attnames, before):
+            new = getattr(instance, attname)
+            if type(new) is not type(old) or new != old:
+                cleaned[attname] = new
+        results.append((errors, cleaned))
+    return results
+
+
+def _clean_in_pool(instances, processes, chunk_size, exclude=None):
+    exclude = list(exclude or ())
+    payloads = [
+        (serialize_many(instances[start:start + chunk_size]), exclude)
+        for start in range(0, len(instances), chunk_size)]
+    pool = multiprocessing.Pool(processes, initializer=_init_worker)
+    try:
+        results = pool.map(_clean_chunk, payloads)
+    finally:
+        pool.terminate()
+        pool.join()
+
+    errors = []
+    for instance, (field_errors, cleaned) in zip(
+            instances, chain.from_iterable(results)):
+        for attname, value in cleaned.items():
+            setattr(instance, attname, value)
+        errors.append(_clean(
+            instance, dict(field_errors),
+            exclude=_get_field_names(instance, relations=False) + exclude))
+    return errors
+
+
+def _add_errors(errors, new_errors):
+    for key, messages in new_errors.items():
+        errors.setdefault(key, []).extend(messages)
+
+
+def _get_unique_key(model_class, unique_check, instance):
+    """
+    Returns the values `instance` is checked with, or `None` if it isn't
+    checked, like `Model._perform_unique_checks`.
+    """
+    key = []
+    for name in unique_check:
+        field = model_class._meta.get_field(name)
+        value = getattr(instance, field.attname)
+        if value is None:
+            return None
+        if field.primary_key and not instance._state.adding:
+            return None
+        key.append(field.get_prep_value(value))
+    return tuple(key)
+
+
+def _find_unique_conflicts(model_class, unique_check, instances,
+                           batch_size=None):
+    """
+    Returns the indexes of the `instances` whose values for `unique_check`
+    are taken by a row other than their own, or by a previous instance.
+    """
+    opts = model_class._meta
+    fields = [opts.get_field(name) for name in unique_check]
+    conflicts = set()
+    keys = {}
+    for index, instance in enumerate(instances):
+        key = _get_unique_key(model_class, unique_check, instance)
+        if key is None:
+            continue
+        if key in keys:
+            conflicts.add(index)
+        else:
+            keys[key] = index
+    if not keys:
+        return conflicts
+
+    # Like Model.validate_unique, the query of each instance's model
+    # determines the database, in practice the same for all of them
+    using = router.db_for_read(model_class, instance=instances[0])
+    connection = connections[using]
+    queryset = model_class._default_manager.using(using)
+    values = list(keys)
+    size = batch_size or connection.ops.bulk_batch_size(
+        list(unique_check), values)
+    for start in range(0, len(values), max(size, 1)):
+        batch = values[start:start + size]
+        if len(fields) == 1:
+            condition = Q(**{
+                '%s__in' % unique_check[0]: [key[0] for key in batch]})
+        else:
+            condition = reduce(operator.or_, [
+                Q(**dict(zip(unique_check, key))) for key in batch])
+        rows = queryset.filter(condition).values_list('pk', *unique_check)
+        for row in rows:
+            key = tuple(
+                field.get_prep_value(value)
+                for field, value in zip(fields, row[1:]))
+            index = keys.get(key)
+            if index is None:
+                continue
+            instance = instances[index]
+            pk = instance._get_pk_val(opts)
+            if instance._state.adding or pk is None or row[0] != pk:
+                conflicts.add(index)
+    return conflicts